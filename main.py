@@ -1,50 +1,164 @@
 import asyncio
 import os
-import json
 import random
 import time
 import logging
 import hashlib
+import gzip
+import zlib
 import re
-import secrets
+import html
+import orjson
+import uvloop
+import rcssmin
+import rjsmin
 from datetime import datetime, timedelta
-from threading import Thread
-from queue import Queue
+from functools import lru_cache
+from threading import Thread, Condition, Lock
+from collections import deque, Counter, OrderedDict
+from itertools import count
+from types import MappingProxyType
 from telethon import TelegramClient, errors
 from telethon.tl.functions.channels import InviteToChannelRequest
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from telegram.error import RetryAfter
 from telegram.ext import (
     Application, CommandHandler, ConversationHandler, 
     MessageHandler, filters, ContextTypes
 )
 
-from flask import Flask, render_template_string, jsonify, Response, request, abort
-from pymongo import MongoClient
-import queue
+from flask import Flask, render_template_string, Response, request, abort
+from flask_compress import Compress
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from pymongo import MongoClient, UpdateOne, WriteConcern
+from waitress import create_server
+from pymongo.errors import CollectionInvalid, BulkWriteError
 
 # ==================== CONFIGURATION ====================
 BOT_TOKEN = os.environ.get('BOT_TOKEN')
 MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
 ADMIN_LOG_CHANNEL = int(os.environ.get('ADMIN_LOG_CHANNEL', -1001234567890))
-ADMIN_USER_IDS = [int(x.strip()) for x in os.environ.get('ADMIN_USER_IDS', '').split(',') if x.strip()]  # Comma-separated admin IDs
+ADMIN_USER_IDS = frozenset(int(x.strip()) for x in os.environ.get('ADMIN_USER_IDS', '').split(',') if x.strip())  # Comma-separated admin IDs
 PORT = int(os.environ.get('PORT', 10000))
+WEB_THREADS = int(os.environ.get('WEB_THREADS', 32))  # Each open dashboard stream holds one
+STREAM_MAX_TOTAL = max(1, WEB_THREADS - 8)  # Open SSE streams allowed; the rest of the threads serve pages and /health
+STREAM_MAX_PER_USER = 2  # Open SSE streams allowed per user across all their tabs and links
 APP_URL = os.environ.get('APP_URL', 'https://your-app.onrender.com')
+DASHBOARD_DEBUG = os.environ.get('DASHBOARD_DEBUG') == '1'  # Serve unminified dashboard CSS/JS
+LOG_BATCH_INTERVAL = float(os.environ.get('LOG_BATCH_INTERVAL', 0.25))  # Seconds a dashboard stream gathers logs into one frame
+DASHBOARD_SECRET = os.environ.get('DASHBOARD_SECRET') or BOT_TOKEN  # Signs dashboard links
+DASHBOARD_TOKEN_MAX_AGE = 30 * 24 * 3600  # Seconds a dashboard link stays valid
+LEGACY_TOKEN_CACHE_TTL = 60.0  # Seconds a resolved legacy dashboard token is trusted before rechecking MongoDB
+MONGO_MIN_POOL = int(os.environ.get('MONGO_MIN_POOL', 20))  # Connections kept open and warm
+MONGO_MAX_POOL = int(os.environ.get('MONGO_MAX_POOL', 200))  # Lower this on small Atlas tiers
 
 # Premium settings
 PREMIUM_PRICE = 10.0  # Price in USD or your currency
 TRIAL_DAYS = 3  # Free trial days for new users
 
+# Log storage settings (capped collection, oldest entries are evicted automatically)
+LOGS_CAPPED_SIZE = 256 * 1024 * 1024  # 256 MB
+LOGS_CAPPED_MAX = 1_000_000
+TASK_FLUSH_INTERVAL = 0.25  # Seconds to coalesce task status writes
+LOG_FLUSH_INTERVAL = 0.5  # Seconds to gather app log records into one insert_many
+MEMBER_FLUSH_INTERVAL = 1.0  # Seconds to gather added members into one insert_many
+USER_LOGS_MAX_USERS = 500  # Users whose recent dashboard logs are kept in memory
+USER_CACHE_TTL = 2.0  # Seconds a cached user document stays fresh
+USER_CACHE_MAX = 4096  # Cached user documents kept before the oldest are evicted
+PREMIUM_CACHE_TTL = 30.0  # Seconds a computed premium status is reused
+ADMIN_STREAM_INTERVAL = 5  # Minimum seconds between admin dashboard recomputes
+TEMP_CLIENT_TTL = 15 * 60  # Seconds an idle login client is kept before it is disconnected
+CLIENT_IDLE_TTL = 10 * 60  # Seconds a cached client is kept after its task ends before it is disconnected
+RATE_LIMIT_BURST = 5.0  # Dashboard API requests a user may make back to back
+RATE_LIMIT_PER_SEC = 2.0  # Sustained dashboard API requests per second per user
+BROADCAST_RATE = 25  # Broadcast messages started per second, under Telegram's ~30/s bot limit
+BROADCAST_CONCURRENCY = 25  # Broadcast sends in flight at once
+
+if not BOT_TOKEN:
+    # Also the default secret for signing dashboard links, so nothing below can start without it
+    print("❌ BOT_TOKEN environment variable is not set")
+    exit(1)
+
 # ==================== DATABASE SETUP ====================
 try:
-    mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+    mongo_client = MongoClient(
+        MONGO_URI,
+        serverSelectionTimeoutMS=5000,
+        minPoolSize=MONGO_MIN_POOL,
+        maxPoolSize=MONGO_MAX_POOL,
+        waitQueueTimeoutMS=2000,
+        socketTimeoutMS=30000,
+        retryWrites=True,
+        compressors='zstd,zlib'
+    )
     mongo_client.admin.command('ping')
     db = mongo_client['telegram_invite_bot']
     users_collection = db['users']
     stats_collection = db['stats']
     tasks_collection = db['tasks']
-    logs_collection = db['logs']
+    # App logs are best effort: capped, and written without waiting for an acknowledgement
+    logs_collection = db.get_collection('logs', write_concern=WriteConcern(w=0))
     premium_collection = db['premium_users']
     payments_collection = db['payments']
+    added_members_collection = db['added_members']
+    
+    # One-off setup and migrations can run for minutes on a large deployment, so they use
+    # their own client without the runtime socket timeout
+    with MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000) as setup_client:
+        setup_db = setup_client['telegram_invite_bot']
+        setup_users = setup_db['users']
+        setup_added_members = setup_db['added_members']
+        try:
+            setup_db.create_collection('logs', capped=True, size=LOGS_CAPPED_SIZE, max=LOGS_CAPPED_MAX)
+        except CollectionInvalid:
+            # Already exists - convert a legacy uncapped collection in place
+            if not setup_db['logs'].options().get('capped'):
+                setup_db.command('convertToCapped', 'logs', size=LOGS_CAPPED_SIZE)
+        setup_users.create_index('dashboard_token', sparse=True)
+        setup_users.create_index('created_at')
+        setup_users.create_index('user_id')
+        setup_db['premium_users'].create_index('user_id')
+        setup_db['premium_users'].create_index('expires_at')
+        # One-time backfill of the denormalized member counter
+        setup_users.update_many(
+            {'added_count': {'$exists': False}},
+            [{'$set': {'added_count': {'$size': {'$ifNull': ['$added_members', []]}}}}]
+        )
+        setup_added_members.create_index([('user_id', 1), ('member_id', 1)], unique=True)
+        # Legacy stored dashboard tokens get one expiry window from the first start that knows
+        # about signed tokens, and are removed once it has passed
+        setup_users.update_many(
+            {'dashboard_token': {'$exists': True}, 'dashboard_token_expires_at': {'$exists': False}},
+            {'$set': {'dashboard_token_expires_at': datetime.now() + timedelta(seconds=DASHBOARD_TOKEN_MAX_AGE)}}
+        )
+        setup_users.update_many(
+            {'dashboard_token_expires_at': {'$lte': datetime.now()}},
+            {'$unset': {'dashboard_token': '', 'dashboard_token_expires_at': ''}}
+        )
+        # One-time move of the legacy per-user added_members arrays into their own collection,
+        # streamed in chunks so memory stays bounded however many users are migrated
+        def copy_legacy_members(rows, user_ids):
+            try:
+                if rows:
+                    setup_added_members.insert_many(rows, ordered=False)
+            except BulkWriteError as e:
+                # Duplicates are rows already copied by an earlier, interrupted run; anything else
+                # aborts startup before these users' arrays are removed
+                if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                    raise
+            # Every row of these users is in this chunk, so their arrays can go
+            setup_users.update_many({'user_id': {'$in': user_ids}}, {'$unset': {'added_members': ''}})
+        
+        legacy_rows = []
+        legacy_ids = []
+        for user in setup_users.find({'added_members': {'$exists': True}}, {'user_id': 1, 'added_members': 1, '_id': 0}):
+            legacy_rows.extend({'user_id': user['user_id'], 'member_id': member_id} for member_id in user.get('added_members') or [])
+            legacy_ids.append(user['user_id'])
+            if len(legacy_rows) >= 10000:
+                copy_legacy_members(legacy_rows, legacy_ids)
+                legacy_rows, legacy_ids = [], []
+        if legacy_ids:
+            copy_legacy_members(legacy_rows, legacy_ids)
     print("✅ MongoDB connected successfully!")
 except Exception as e:
     print(f"❌ MongoDB connection failed: {e}")
@@ -52,45 +166,85 @@ except Exception as e:
 
 # ==================== FLASK APP SETUP ====================
 app = Flask(__name__)
-LOG_QUEUE = Queue(maxsize=1000)
-USER_LOG_QUEUES = {}
-DASHBOARD_TOKENS = {}
+app.config.update(
+    COMPRESS_ALGORITHM=['br', 'gzip'],
+    COMPRESS_MIN_SIZE=500,
+    # text/event-stream is left out, and streamed responses are never buffered,
+    # so SSE and the dashboard head flush reach the browser immediately
+    COMPRESS_MIMETYPES=['text/html', 'text/css', 'application/json', 'application/javascript'],
+    COMPRESS_STREAMS=False
+)
+Compress(app)
+LOG_QUEUE = deque(maxlen=1000)  # App log entries waiting for log_flusher; the oldest are overwritten
+USER_LOGS = OrderedDict()  # user_id -> deque of the latest log entries, least recently logged first; guarded by DASHBOARD_UPDATE
+# Log sequence numbers start from the clock so they keep increasing across restarts
+LOG_SEQ = count(int(time.time() * 1000))
+DASHBOARD_TOKENS_ISSUED = 0  # Dashboard links handed out since startup, for the admin panel
+TOKEN_SERIALIZER = URLSafeTimedSerializer(DASHBOARD_SECRET, salt='dashboard')
+DASHBOARD_UPDATE = Condition()
+DASHBOARD_VERSIONS = {}  # user_id -> counter bumped on every task state change
+TASK_EVENTS = 0  # Bumped on any user's task state change, watched by the admin stream
+RATE_BUCKETS = {}  # user_id -> (last refill, tokens left), guarded by RATE_BUCKETS_LOCK
+RATE_BUCKETS_LOCK = Lock()
+RATE_BUCKETS_PRUNED_AT = 0.0  # Monotonic time refilled buckets were last dropped
+STREAM_COUNTS = Counter()  # user_id -> open SSE streams, guarded by STREAM_LOCK
+STREAM_LOCK = Lock()
+WEB_SERVER = None  # waitress server, started with the bot in post_init
 
 # ==================== LOGGING HANDLERS ====================
 class QueueHandler(logging.Handler):
     def emit(self, record):
+        now = datetime.now()
         log_entry = {
-            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'time': now.strftime('%Y-%m-%d %H:%M:%S'),
             'level': record.levelname,
-            'message': self.format(record)
+            'message': self.format(record),
+            'timestamp': now
         }
+        # The Mongo write happens on the log_flusher thread, never on the caller's
+        LOG_QUEUE.append(log_entry)
+
+def flush_logs():
+    batch = []
+    try:
+        while True:
+            batch.append(LOG_QUEUE.popleft())
+    except IndexError:
+        pass
+    if batch:
         try:
-            LOG_QUEUE.put_nowait(log_entry)
-            logs_collection.insert_one({
-                **log_entry,
-                'timestamp': datetime.now()
-            })
+            logs_collection.insert_many(batch, ordered=False)
         except:
             pass
 
+def log_flusher():
+    """Write queued app log records to MongoDB in batches"""
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        flush_logs()
+
 class UserLogHandler(logging.Handler):
     def __init__(self, user_id):
         super().__init__()
         self.user_id = str(user_id)
         
     def emit(self, record):
-        if self.user_id not in USER_LOG_QUEUES:
-            USER_LOG_QUEUES[self.user_id] = Queue(maxsize=500)
-        
         log_entry = {
+            'seq': next(LOG_SEQ),
             'time': datetime.now().strftime('%H:%M:%S'),
             'level': record.levelname,
             'message': self.format(record)
         }
-        try:
-            USER_LOG_QUEUES[self.user_id].put_nowait(log_entry)
-        except:
-            pass
+        with DASHBOARD_UPDATE:
+            logs = USER_LOGS.get(self.user_id)
+            if logs is None:
+                if len(USER_LOGS) >= USER_LOGS_MAX_USERS:
+                    USER_LOGS.popitem(last=False)
+                logs = USER_LOGS[self.user_id] = deque(maxlen=500)
+            else:
+                USER_LOGS.move_to_end(self.user_id)
+            logs.append(log_entry)
+            DASHBOARD_UPDATE.notify_all()
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -107,43 +261,79 @@ API_ID, API_HASH, PHONE, OTP_CODE, TWO_FA_PASSWORD, SOURCE, TARGET, INVITE_LINK,
 # ==================== ACTIVE TASKS ====================
 ACTIVE_TASKS = {}
 TEMP_CLIENTS = {}
+CLIENTS = {}  # Connected TelegramClients kept alive between tasks
+CLIENT_LAST_USED = {}  # user_id -> monotonic time the cached client last had a task
+# Logged-in session files, scanned once so handlers don't stat the disk
+SESSION_FILES = {entry.name for entry in os.scandir('.') if entry.name.endswith('.session')}
+
+def has_session(user_id):
+    return f'session_{user_id}.session' in SESSION_FILES
 
 # ==================== KEYBOARD LAYOUTS ====================
+# Built once; PTB never mutates a markup after it is sent
+MAIN_KEYBOARD = ReplyKeyboardMarkup([
+    [KeyboardButton('🚀 Start Task'), KeyboardButton('🔄 Resume Task')],
+    [KeyboardButton('⏸ Pause Task'), KeyboardButton('⏹ Stop Task')],
+    [KeyboardButton('📊 Statistics'), KeyboardButton('🗑 Clear History')],
+    [KeyboardButton('🌐 Dashboard'), KeyboardButton('⚙️ Settings')],
+    [KeyboardButton('💎 Premium Status'), KeyboardButton('❓ Help')]
+], resize_keyboard=True, one_time_keyboard=False)
+
+ADMIN_KEYBOARD = ReplyKeyboardMarkup([
+    [KeyboardButton('👥 User Stats'), KeyboardButton('💎 Premium Users')],
+    [KeyboardButton('🎁 Grant Premium'), KeyboardButton('❌ Revoke Premium')],
+    [KeyboardButton('📢 Broadcast'), KeyboardButton('📊 System Stats')],
+    [KeyboardButton('🔙 Back to Main')]
+], resize_keyboard=True)
+
+SETTINGS_KEYBOARD = ReplyKeyboardMarkup([
+    [KeyboardButton('⏱ Delay Settings'), KeyboardButton('⏸ Pause Duration')],
+    [KeyboardButton('📨 DM Settings'), KeyboardButton('🔍 Scraping Mode')],
+    [KeyboardButton('🔄 Reset Session'), KeyboardButton('📊 View Settings')],
+    [KeyboardButton('🔙 Back to Main')]
+], resize_keyboard=True)
+
+CANCEL_KEYBOARD = ReplyKeyboardMarkup([[KeyboardButton('❌ Cancel')]], resize_keyboard=True)
+
 def get_main_keyboard():
-    keyboard = [
-        [KeyboardButton('🚀 Start Task'), KeyboardButton('🔄 Resume Task')],
-        [KeyboardButton('⏸ Pause Task'), KeyboardButton('⏹ Stop Task')],
-        [KeyboardButton('📊 Statistics'), KeyboardButton('🗑 Clear History')],
-        [KeyboardButton('🌐 Dashboard'), KeyboardButton('⚙️ Settings')],
-        [KeyboardButton('💎 Premium Status'), KeyboardButton('❓ Help')]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return MAIN_KEYBOARD
 
 def get_admin_keyboard():
-    keyboard = [
-        [KeyboardButton('👥 User Stats'), KeyboardButton('💎 Premium Users')],
-        [KeyboardButton('🎁 Grant Premium'), KeyboardButton('❌ Revoke Premium')],
-        [KeyboardButton('📢 Broadcast'), KeyboardButton('📊 System Stats')],
-        [KeyboardButton('🔙 Back to Main')]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return ADMIN_KEYBOARD
 
 def get_settings_keyboard():
-    keyboard = [
-        [KeyboardButton('⏱ Delay Settings'), KeyboardButton('⏸ Pause Duration')],
-        [KeyboardButton('📨 DM Settings'), KeyboardButton('🔍 Scraping Mode')],
-        [KeyboardButton('🔄 Reset Session'), KeyboardButton('📊 View Settings')],
-        [KeyboardButton('🔙 Back to Main')]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return SETTINGS_KEYBOARD
 
 def get_cancel_keyboard():
-    keyboard = [[KeyboardButton('❌ Cancel')]]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return CANCEL_KEYBOARD
 
 # ==================== DATABASE FUNCTIONS ====================
-def get_user_from_db(user_id):
-    return users_collection.find_one({'user_id': str(user_id)})
+def get_user_from_db(user_id, projection=None):
+    return users_collection.find_one({'user_id': str(user_id)}, projection)
+
+USER_CACHE = OrderedDict()  # user_id -> (fetched_at, user document), oldest first; guarded by CACHE_LOCK
+CACHE_LOCK = Lock()  # The caches are shared by the event loop, to_thread workers and waitress threads
+
+def get_user_cached(user_id):
+    """Short-lived cached user lookup for bursty handlers and dashboard polls"""
+    user_id = str(user_id)
+    now = time.monotonic()
+    with CACHE_LOCK:
+        entry = USER_CACHE.get(user_id)
+    if entry and now - entry[0] < USER_CACHE_TTL:
+        return entry[1]
+    user = get_user_from_db(user_id)
+    with CACHE_LOCK:
+        USER_CACHE[user_id] = (now, user)
+        USER_CACHE.move_to_end(user_id)
+        while len(USER_CACHE) > USER_CACHE_MAX:
+            USER_CACHE.popitem(last=False)
+    return user
+
+def invalidate_user(user_id):
+    with CACHE_LOCK:
+        USER_CACHE.pop(str(user_id), None)
+        PREMIUM_CACHE.pop(str(user_id), None)
 
 def save_user_to_db(user_id, data):
     users_collection.update_one(
@@ -151,52 +341,168 @@ def save_user_to_db(user_id, data):
         {'$set': {**data, 'updated_at': datetime.now()}},
         upsert=True
     )
+    invalidate_user(user_id)
+
+def save_user_settings(user_id, settings):
+    """Update individual settings fields without replacing the whole settings document"""
+    users_collection.update_one(
+        {'user_id': str(user_id)},
+        {'$set': {
+            **{f'settings.{key}': value for key, value in settings.items()},
+            'updated_at': datetime.now()
+        }}
+    )
+    invalidate_user(user_id)
 
 def get_task_from_db(user_id):
     return tasks_collection.find_one({'user_id': str(user_id)})
 
+DIRTY_TASKS = {}  # user_id -> pending $set fields, merged until the next flush
+TASKS_DIRTY = asyncio.Event()
+TASK_FLUSH_LOCK = asyncio.Lock()  # Keeps an explicit flush from overtaking one already in flight
+
 def save_task_to_db(user_id, task_data):
-    tasks_collection.update_one(
-        {'user_id': str(user_id)},
-        {'$set': {**task_data, 'updated_at': datetime.now()}},
-        upsert=True
-    )
+    """Mark a task dirty; task_write_flusher writes pending changes in batches"""
+    DIRTY_TASKS.setdefault(str(user_id), {}).update(task_data, updated_at=datetime.now())
+    TASKS_DIRTY.set()
+
+async def flush_task_writes():
+    """Write every dirty task in one bulk_write, off the event loop"""
+    global DIRTY_TASKS
+    async with TASK_FLUSH_LOCK:
+        TASKS_DIRTY.clear()
+        if not DIRTY_TASKS:
+            return
+        pending, DIRTY_TASKS = DIRTY_TASKS, {}
+        ops = [
+            UpdateOne({'user_id': user_id}, {'$set': fields}, upsert=True)
+            for user_id, fields in pending.items()
+        ]
+        try:
+            # One op per user, so ordering between them doesn't matter
+            await asyncio.to_thread(tasks_collection.bulk_write, ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to flush task updates: {e}")
+
+async def task_write_flusher():
+    while True:
+        await TASKS_DIRTY.wait()
+        await asyncio.sleep(TASK_FLUSH_INTERVAL)
+        await flush_task_writes()
 
-def is_member_already_added(user_id, member_id):
-    user_data = get_user_from_db(user_id)
-    if user_data and 'added_members' in user_data:
-        return str(member_id) in user_data['added_members']
-    return False
+PENDING_MEMBERS = []  # added_members rows waiting for member_write_flusher
+ADDED_MEMBER_SETS = {}  # user_id -> in-memory mirror of added_members for the running task
+MEMBERS_PENDING = asyncio.Event()
+MEMBER_FLUSH_LOCK = asyncio.Lock()  # Lets explicit flushes wait for one already in flight
 
 def mark_member_as_added(user_id, member_id):
-    users_collection.update_one(
-        {'user_id': str(user_id)},
-        {'$addToSet': {'added_members': str(member_id)}}
-    )
+    """Queue an added member; member_write_flusher inserts them in batches"""
+    PENDING_MEMBERS.append({
+        'user_id': str(user_id),
+        'member_id': str(member_id),
+        'added_at': datetime.now()
+    })
+    MEMBERS_PENDING.set()
+
+def write_added_members(rows):
+    """Insert rows and bump added_count by what was actually new; returns the affected user ids"""
+    duplicates = set()
+    try:
+        added_members_collection.insert_many(rows, ordered=False)
+    except BulkWriteError as e:
+        duplicates = {error['index'] for error in e.details['writeErrors'] if error['code'] == 11000}
+        if len(duplicates) != len(e.details['writeErrors']):
+            raise
+    inserted = Counter(row['user_id'] for i, row in enumerate(rows) if i not in duplicates)
+    if inserted:
+        users_collection.bulk_write([
+            UpdateOne({'user_id': user_id}, {'$inc': {'added_count': count}})
+            for user_id, count in inserted.items()
+        ], ordered=False)
+    for user_id in inserted:
+        invalidate_user(user_id)
+    return inserted
+
+async def flush_member_writes():
+    global PENDING_MEMBERS
+    async with MEMBER_FLUSH_LOCK:
+        MEMBERS_PENDING.clear()
+        if not PENDING_MEMBERS:
+            return
+        rows, PENDING_MEMBERS = PENDING_MEMBERS, []
+        try:
+            for user_id in await asyncio.to_thread(write_added_members, rows):
+                notify_dashboard(user_id)
+        except Exception as e:
+            logger.error(f"Failed to flush added members: {e}")
+
+async def member_write_flusher():
+    while True:
+        await MEMBERS_PENDING.wait()
+        await asyncio.sleep(MEMBER_FLUSH_INTERVAL)
+        await flush_member_writes()
+
+def get_added_member_ids(user_id):
+    return {doc['member_id'] for doc in added_members_collection.find({'user_id': str(user_id)}, {'member_id': 1, '_id': 0})}
+
+def clear_added_members(user_id):
+    added_members_collection.delete_many({'user_id': str(user_id)})
+    users_collection.update_one({'user_id': str(user_id)}, {'$set': {'added_count': 0}})
+    invalidate_user(user_id)
+
+def get_total_invites():
+    """Sum added_count across all users on the server"""
+    result = list(users_collection.aggregate([
+        {'$group': {'_id': None, 'total': {'$sum': '$added_count'}}}
+    ]))
+    return result[0]['total'] if result else 0
+
+def count_trial_users():
+    """Users inside the trial window without a premium record, counted in MongoDB"""
+    # check_premium_status treats (now - created_at).days <= TRIAL_DAYS as trial
+    result = list(users_collection.aggregate([
+        {'$match': {'created_at': {'$gt': datetime.now() - timedelta(days=TRIAL_DAYS + 1)}}},
+        {'$lookup': {'from': premium_collection.name, 'localField': 'user_id', 'foreignField': 'user_id', 'as': 'premium'}},
+        {'$match': {'premium': {'$size': 0}}},
+        {'$count': 'total'}
+    ]))
+    return result[0]['total'] if result else 0
 
 def generate_dashboard_token(user_id):
-    token = secrets.token_urlsafe(32)
-    DASHBOARD_TOKENS[token] = {
-        'user_id': str(user_id),
-        'created': datetime.now().isoformat(),
-        'last_accessed': datetime.now().isoformat()
-    }
-    users_collection.update_one(
-        {'user_id': str(user_id)},
-        {'$set': {'dashboard_token': token}}
+    """Sign the user_id into the token so resolving it needs no database lookup"""
+    global DASHBOARD_TOKENS_ISSUED
+    DASHBOARD_TOKENS_ISSUED += 1
+    return TOKEN_SERIALIZER.dumps(str(user_id))
+
+LEGACY_TOKEN_CACHE = OrderedDict()  # legacy token -> (resolved_at, user_id), hits only; guarded by LEGACY_TOKEN_LOCK
+LEGACY_TOKEN_LOCK = Lock()
+
+def get_user_id_for_stored_token(token):
+    """Resolve a legacy random token persisted in MongoDB, until its cutoff"""
+    now = time.monotonic()
+    with LEGACY_TOKEN_LOCK:
+        entry = LEGACY_TOKEN_CACHE.get(token)
+        if entry and now - entry[0] < LEGACY_TOKEN_CACHE_TTL:
+            return entry[1]
+    user = users_collection.find_one(
+        {'dashboard_token': token, 'dashboard_token_expires_at': {'$gt': datetime.now()}},
+        {'user_id': 1, '_id': 0}
     )
-    return token
+    if not user:
+        # Misses are not cached, so junk tokens cannot push real ones out
+        return None
+    with LEGACY_TOKEN_LOCK:
+        LEGACY_TOKEN_CACHE[token] = (now, user['user_id'])
+        LEGACY_TOKEN_CACHE.move_to_end(token)
+        while len(LEGACY_TOKEN_CACHE) > USER_CACHE_MAX:
+            LEGACY_TOKEN_CACHE.popitem(last=False)
+    return user['user_id']
 
 def get_user_from_token(token):
-    if token in DASHBOARD_TOKENS:
-        DASHBOARD_TOKENS[token]['last_accessed'] = datetime.now().isoformat()
-        return DASHBOARD_TOKENS[token]['user_id']
-    
-    user = users_collection.find_one({'dashboard_token': token})
-    if user:
-        return user['user_id']
-    
-    return EDIT_PAUSE_TIME
+    try:
+        return TOKEN_SERIALIZER.loads(token, max_age=DASHBOARD_TOKEN_MAX_AGE)
+    except BadSignature:
+        return get_user_id_for_stored_token(token)
     
 async def edit_dm_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message.text == '❌ Cancel':
@@ -220,13 +526,7 @@ async def edit_dm_message_handler(update: Update, context: ContextTypes.DEFAULT_
         )
         return EDIT_DM_MESSAGE
     
-    users_collection.update_one(
-        {'user_id': user_id},
-        {'$set': {
-            'settings.dm_message': new_message,
-            'updated_at': datetime.now()
-        }}
-    )
+    await asyncio.to_thread(save_user_settings, user_id, {'dm_message': new_message})
     
     is_running = user_id in ACTIVE_TASKS
     
@@ -249,48 +549,52 @@ async def edit_dm_message_handler(update: Update, context: ContextTypes.DEFAULT_
     return SETTINGS_MENU
 
 # ==================== PREMIUM COMMANDS ====================
+ADMIN_STATUS_TEXT = (
+    "👑 <b>Admin Account</b>\n\n"
+    "✨ You have unlimited access to all features!\n\n"
+    "🔧 Use Admin Panel to manage users"
+)
+# Only days_left and expires_at vary; the rest is built once at import
+TRIAL_STATUS_TEMPLATE = (
+    "🎁 <b>Free Trial Active</b>\n\n"
+    "⏰ Days Remaining: <b>{days_left}</b>\n"
+    "📅 Expires: {expires_at:%Y-%m-%d %H:%M}\n\n"
+    "💎 <b>Enjoying the trial?</b>\n"
+    f"Upgrade to premium: ${PREMIUM_PRICE}/week\n\n"
+    "📞 Contact: @NY_BOTS"
+)
+PREMIUM_STATUS_TEMPLATE = (
+    "💎 <b>Premium Active</b>\n\n"
+    "⏰ Days Remaining: <b>{days_left}</b>\n"
+    "📅 Expires: {expires_at:%Y-%m-%d %H:%M}\n\n"
+    "✅ All features unlocked!\n\n"
+    "🔄 To renew: @NY_BOTS"
+)
+FREE_STATUS_TEXT = (
+    "🆓 <b>Free Account</b>\n\n"
+    "❌ Premium features locked\n\n"
+    "💎 <b>Upgrade to Premium:</b>\n"
+    f"💰 Price: ${PREMIUM_PRICE}/week\n"
+    f"🎁 Free trial: {TRIAL_DAYS} days\n\n"
+    "🌟 <b>Benefits:</b>\n"
+    "✅ Custom delay settings\n"
+    "✅ Unlimited invites\n"
+    "✅ Priority support\n"
+    "✅ Advanced controls\n\n"
+    "📞 Contact: @NY_BOTS"
+)
+
 async def premium_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
-    premium_status = check_premium_status(user_id)
+    premium_status = await asyncio.to_thread(check_premium_status, user_id)
     
     if is_admin(user_id):
-        status_text = (
-            "👑 <b>Admin Account</b>\n\n"
-            "✨ You have unlimited access to all features!\n\n"
-            "🔧 Use Admin Panel to manage users"
-        )
+        status_text = ADMIN_STATUS_TEXT
     elif premium_status['is_premium']:
-        if premium_status['type'] == 'trial':
-            status_text = (
-                f"🎁 <b>Free Trial Active</b>\n\n"
-                f"⏰ Days Remaining: <b>{premium_status['days_left']}</b>\n"
-                f"📅 Expires: {premium_status['expires_at'].strftime('%Y-%m-%d %H:%M')}\n\n"
-                f"💎 <b>Enjoying the trial?</b>\n"
-                f"Upgrade to premium: ${PREMIUM_PRICE}/week\n\n"
-                f"📞 Contact: @NY_BOTS"
-            )
-        else:
-            status_text = (
-                f"💎 <b>Premium Active</b>\n\n"
-                f"⏰ Days Remaining: <b>{premium_status['days_left']}</b>\n"
-                f"📅 Expires: {premium_status['expires_at'].strftime('%Y-%m-%d %H:%M')}\n\n"
-                f"✅ All features unlocked!\n\n"
-                f"🔄 To renew: @NY_BOTS"
-            )
+        template = TRIAL_STATUS_TEMPLATE if premium_status['type'] == 'trial' else PREMIUM_STATUS_TEMPLATE
+        status_text = template.format_map(premium_status)
     else:
-        status_text = (
-            f"🆓 <b>Free Account</b>\n\n"
-            f"❌ Premium features locked\n\n"
-            f"💎 <b>Upgrade to Premium:</b>\n"
-            f"💰 Price: ${PREMIUM_PRICE}/week\n"
-            f"🎁 Free trial: {TRIAL_DAYS} days\n\n"
-            f"🌟 <b>Benefits:</b>\n"
-            f"✅ Custom delay settings\n"
-            f"✅ Unlimited invites\n"
-            f"✅ Priority support\n"
-            f"✅ Advanced controls\n\n"
-            f"📞 Contact: @NY_BOTS"
-        )
+        status_text = FREE_STATUS_TEXT
     
     await update.message.reply_text(
         status_text,
@@ -310,17 +614,13 @@ async def admin_panel_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ConversationHandler.END
     
-    total_users = users_collection.count_documents({})
-    total_premium = premium_collection.count_documents({'expires_at': {'$gt': datetime.now()}})
+    total_users, total_premium, trial_users = await asyncio.gather(
+        asyncio.to_thread(users_collection.count_documents, {}),
+        asyncio.to_thread(premium_collection.count_documents, {'expires_at': {'$gt': datetime.now()}}),
+        asyncio.to_thread(count_trial_users)
+    )
     total_active_tasks = len(ACTIVE_TASKS)
     
-    # Get trial users
-    trial_users = 0
-    for user in users_collection.find():
-        status = check_premium_status(user['user_id'])
-        if status['is_premium'] and status['type'] == 'trial':
-            trial_users += 1
-    
     admin_text = (
         f"👑 <b>Admin Control Panel</b>\n\n"
         f"📊 <b>System Statistics:</b>\n"
@@ -353,10 +653,15 @@ async def handle_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
     
     elif text == '👥 User Stats':
-        total_users = users_collection.count_documents({})
-        recent_users = users_collection.count_documents({
-            'created_at': {'$gte': datetime.now() - timedelta(days=7)}
-        })
+        total_users, recent_users, recent = await asyncio.gather(
+            asyncio.to_thread(users_collection.count_documents, {}),
+            asyncio.to_thread(users_collection.count_documents, {
+                'created_at': {'$gte': datetime.now() - timedelta(days=7)}
+            }),
+            asyncio.to_thread(
+                lambda: list(users_collection.find({}, {'username': 1, 'first_name': 1}).sort('created_at', -1).limit(10))
+            )
+        )
         
         stats_text = (
             f"📊 <b>User Statistics</b>\n\n"
@@ -365,7 +670,6 @@ async def handle_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE)
             f"📈 <b>Recent Users:</b>\n"
         )
         
-        recent = users_collection.find().sort('created_at', -1).limit(10)
         for i, user in enumerate(recent, 1):
             username = user.get('username', 'No username')
             name = user.get('first_name', 'Unknown')
@@ -375,10 +679,10 @@ async def handle_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ADMIN_PANEL
     
     elif text == '💎 Premium Users':
-        premium_users = premium_collection.find({'expires_at': {'$gt': datetime.now()}})
-        premium_list = list(premium_users)
+        now = datetime.now()
+        premium_count = await asyncio.to_thread(premium_collection.count_documents, {'expires_at': {'$gt': now}})
         
-        if not premium_list:
+        if not premium_count:
             await update.message.reply_text(
                 "💎 <b>Premium Users</b>\n\n❌ No active premium users",
                 parse_mode='HTML',
@@ -386,13 +690,18 @@ async def handle_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE)
             )
             return ADMIN_PANEL
         
-        premium_text = f"💎 <b>Premium Users ({len(premium_list)})</b>\n\n"
+        premium_text = f"💎 <b>Premium Users ({premium_count})</b>\n\n"
+        premium_list = await asyncio.to_thread(lambda: list(premium_collection.aggregate([
+            {'$match': {'expires_at': {'$gt': now}}},
+            {'$limit': 20},
+            {'$lookup': {'from': 'users', 'localField': 'user_id', 'foreignField': 'user_id', 'as': 'user'}},
+            {'$project': {'_id': 0, 'user_id': 1, 'expires_at': 1, 'username': {'$arrayElemAt': ['$user.username', 0]}}}
+        ])))
         
-        for i, premium in enumerate(premium_list[:20], 1):
+        for i, premium in enumerate(premium_list, 1):
             user_id_str = premium['user_id']
-            user_data = get_user_from_db(user_id_str)
-            username = user_data.get('username', 'N/A') if user_data else 'N/A'
-            days_left = (premium['expires_at'] - datetime.now()).days
+            username = premium.get('username') or 'N/A'
+            days_left = (premium['expires_at'] - now).days
             premium_text += f"{i}. @{username} (ID: {user_id_str})\n   ⏰ {days_left} days left\n\n"
         
         await update.message.reply_text(premium_text, parse_mode='HTML', reply_markup=get_admin_keyboard())
@@ -432,14 +741,12 @@ async def handle_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return BROADCAST_MSG
     
     elif text == '📊 System Stats':
-        total_users = users_collection.count_documents({})
-        total_tasks = tasks_collection.count_documents({})
-        total_premium = premium_collection.count_documents({'expires_at': {'$gt': datetime.now()}})
-        
-        # Calculate total invites
-        total_invites = 0
-        for user in users_collection.find():
-            total_invites += len(user.get('added_members', []))
+        total_users, total_tasks, total_premium, total_invites = await asyncio.gather(
+            asyncio.to_thread(users_collection.count_documents, {}),
+            asyncio.to_thread(tasks_collection.count_documents, {}),
+            asyncio.to_thread(premium_collection.count_documents, {'expires_at': {'$gt': datetime.now()}}),
+            asyncio.to_thread(get_total_invites)
+        )
         
         system_text = (
             f"📊 <b>System Statistics</b>\n\n"
@@ -448,7 +755,7 @@ async def handle_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE)
             f"📋 Total Tasks: <b>{total_tasks}</b>\n"
             f"✅ Total Invites: <b>{total_invites}</b>\n"
             f"⚡ Active Tasks: <b>{len(ACTIVE_TASKS)}</b>\n"
-            f"🌐 Dashboard Tokens: <b>{len(DASHBOARD_TOKENS)}</b>\n\n"
+            f"🌐 Dashboard Tokens: <b>{DASHBOARD_TOKENS_ISSUED}</b>\n\n"
             f"🕐 Uptime: Running\n"
             f"💾 MongoDB: Connected"
         )
@@ -492,7 +799,7 @@ async def grant_premium_handler(update: Update, context: ContextTypes.DEFAULT_TY
             )
             return GRANT_PREMIUM
         
-        expires_at = grant_premium(target_user_id, days)
+        expires_at = await asyncio.to_thread(grant_premium, target_user_id, days)
         
         # Notify the user
         try:
@@ -554,7 +861,7 @@ async def revoke_premium_handler(update: Update, context: ContextTypes.DEFAULT_T
         target_user_id = update.message.text.strip()
         
         # Check if user has premium
-        premium_data = premium_collection.find_one({'user_id': target_user_id})
+        premium_data = await asyncio.to_thread(premium_collection.find_one, {'user_id': target_user_id}, {'_id': 1})
         if not premium_data:
             await update.message.reply_text(
                 "❌ User doesn't have premium access",
@@ -562,7 +869,7 @@ async def revoke_premium_handler(update: Update, context: ContextTypes.DEFAULT_T
             )
             return ADMIN_PANEL
         
-        revoke_premium(target_user_id)
+        await asyncio.to_thread(revoke_premium, target_user_id)
         
         # Notify the user
         try:
@@ -615,21 +922,39 @@ async def broadcast_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='HTML'
     )
     
-    all_users = users_collection.find()
-    success = 0
-    failed = 0
-    
-    for user in all_users:
-        try:
-            await context.bot.send_message(
-                chat_id=int(user['user_id']),
-                text=f"📢 <b>Admin Broadcast</b>\n\n{message_text}",
-                parse_mode='HTML'
-            )
-            success += 1
-            await asyncio.sleep(0.05)  # Rate limit
-        except:
-            failed += 1
+    user_ids = await asyncio.to_thread(
+        lambda: [int(user['user_id']) for user in users_collection.find({}, {'user_id': 1, '_id': 0})]
+    )
+    broadcast_text = f"📢 <b>Admin Broadcast</b>\n\n{message_text}"
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+    next_slot = time.monotonic()
+    
+    async def wait_turn():
+        # Hand out send slots at the moment of sending, so a stall never turns into a burst
+        nonlocal next_slot
+        now = time.monotonic()
+        slot = max(now, next_slot)
+        next_slot = slot + 1 / BROADCAST_RATE
+        await asyncio.sleep(slot - now)
+    
+    async def send(chat_id):
+        nonlocal next_slot
+        async with semaphore:
+            for _ in range(3):
+                await wait_turn()
+                try:
+                    await context.bot.send_message(chat_id=chat_id, text=broadcast_text, parse_mode='HTML')
+                    return True
+                except RetryAfter as e:
+                    # The flood wait applies to the whole bot, so every pending send holds off
+                    next_slot = max(next_slot, time.monotonic() + e.retry_after)
+                except Exception:
+                    return False
+            return False
+    
+    results = await asyncio.gather(*(send(chat_id) for chat_id in user_ids))
+    success = sum(results)
+    failed = len(results) - success
     
     await update.message.reply_text(
         f"✅ <b>Broadcast Complete!</b>\n\n"
@@ -652,13 +977,30 @@ def is_admin(user_id):
     """Check if user is admin"""
     return int(user_id) in ADMIN_USER_IDS
 
+PREMIUM_CACHE = OrderedDict()  # user_id -> (computed_at, premium status), oldest first; guarded by CACHE_LOCK
+
 def check_premium_status(user_id):
     """Check if user has active premium subscription"""
-    premium_data = premium_collection.find_one({'user_id': str(user_id)})
+    user_id = str(user_id)
+    now = time.monotonic()
+    with CACHE_LOCK:
+        entry = PREMIUM_CACHE.get(user_id)
+    if entry and now - entry[0] < PREMIUM_CACHE_TTL:
+        return entry[1]
+    status = compute_premium_status(user_id)
+    with CACHE_LOCK:
+        PREMIUM_CACHE[user_id] = (now, status)
+        PREMIUM_CACHE.move_to_end(user_id)
+        while len(PREMIUM_CACHE) > USER_CACHE_MAX:
+            PREMIUM_CACHE.popitem(last=False)
+    return status
+
+def compute_premium_status(user_id):
+    premium_data = premium_collection.find_one({'user_id': str(user_id)}, {'expires_at': 1})
     
     if not premium_data:
         # Check if user is in trial period
-        user_data = get_user_from_db(user_id)
+        user_data = get_user_from_db(user_id, {'created_at': 1, '_id': 0})
         if user_data:
             created_at = user_data.get('created_at')
             if created_at:
@@ -673,8 +1015,9 @@ def check_premium_status(user_id):
         return {'is_premium': False, 'type': 'free'}
     
     expires_at = premium_data.get('expires_at')
-    if expires_at and expires_at > datetime.now():
-        days_left = (expires_at - datetime.now()).days
+    now = datetime.now()
+    if expires_at and expires_at > now:
+        days_left = (expires_at - now).days
         return {
             'is_premium': True,
             'type': 'premium',
@@ -686,21 +1029,48 @@ def check_premium_status(user_id):
 
 def grant_premium(user_id, days=7):
     """Grant premium access to user"""
-    expires_at = datetime.now() + timedelta(days=days)
+    now = datetime.now()
+    expires_at = now + timedelta(days=days)
     premium_collection.update_one(
         {'user_id': str(user_id)},
         {'$set': {
             'expires_at': expires_at,
-            'granted_at': datetime.now(),
+            'granted_at': now,
             'days': days
         }},
         upsert=True
     )
+    with CACHE_LOCK:
+        PREMIUM_CACHE.pop(str(user_id), None)
     return expires_at
 
 def revoke_premium(user_id):
     """Revoke premium access"""
     premium_collection.delete_one({'user_id': str(user_id)})
+    with CACHE_LOCK:
+        PREMIUM_CACHE.pop(str(user_id), None)
+
+PREMIUM_EXPIRED_TEXT = (
+    "❌ <b>Premium Expired!</b>\n\n"
+    "Your premium subscription has expired.\n\n"
+    "💎 To continue using premium features:\n"
+    "• Contact: @NY_BOTS\n"
+    f"• Price: ${PREMIUM_PRICE}/week\n\n"
+    "Use /premium to check status"
+)
+PREMIUM_REQUIRED_TEXT = (
+    "🔒 <b>Premium Feature!</b>\n\n"
+    "This feature requires premium access.\n\n"
+    "💎 <b>Premium Benefits:</b>\n"
+    "✅ Custom delay settings\n"
+    "✅ Advanced task controls\n"
+    "✅ Priority support\n"
+    "✅ Unlimited invites\n"
+    "✅ Real-time dashboard\n\n"
+    f"💰 <b>Price:</b> ${PREMIUM_PRICE}/week\n"
+    f"🎁 <b>Free Trial:</b> {TRIAL_DAYS} days\n\n"
+    "Contact: @NY_BOTS"
+)
 
 def require_premium(func):
     """Decorator to check premium status before executing function"""
@@ -710,36 +1080,14 @@ def require_premium(func):
         if is_admin(user_id):
             return await func(update, context, *args, **kwargs)
         
-        status = check_premium_status(user_id)
+        status = await asyncio.to_thread(check_premium_status, user_id)
         
         if not status['is_premium']:
-            if status['type'] == 'expired':
-                await update.message.reply_text(
-                    "❌ <b>Premium Expired!</b>\n\n"
-                    "Your premium subscription has expired.\n\n"
-                    "💎 To continue using premium features:\n"
-                    "• Contact: @NY_BOTS\n"
-                    f"• Price: ${PREMIUM_PRICE}/week\n\n"
-                    "Use /premium to check status",
-                    parse_mode='HTML',
-                    reply_markup=get_main_keyboard()
-                )
-            else:
-                await update.message.reply_text(
-                    "🔒 <b>Premium Feature!</b>\n\n"
-                    f"This feature requires premium access.\n\n"
-                    f"💎 <b>Premium Benefits:</b>\n"
-                    f"✅ Custom delay settings\n"
-                    f"✅ Advanced task controls\n"
-                    f"✅ Priority support\n"
-                    f"✅ Unlimited invites\n"
-                    f"✅ Real-time dashboard\n\n"
-                    f"💰 <b>Price:</b> ${PREMIUM_PRICE}/week\n"
-                    f"🎁 <b>Free Trial:</b> {TRIAL_DAYS} days\n\n"
-                    f"Contact: @NY_BOTS",
-                    parse_mode='HTML',
-                    reply_markup=get_main_keyboard()
-                )
+            await update.message.reply_text(
+                PREMIUM_EXPIRED_TEXT if status['type'] == 'expired' else PREMIUM_REQUIRED_TEXT,
+                parse_mode='HTML',
+                reply_markup=get_main_keyboard()
+            )
             return ConversationHandler.END
         
         return await func(update, context, *args, **kwargs)
@@ -747,53 +1095,44 @@ def require_premium(func):
     return wrapper
 
 # ==================== HELPER FUNCTIONS ====================
+def notify_dashboard(user_id):
+    """Wake up the user's dashboard status streams after a task state change"""
+    global TASK_EVENTS
+    with DASHBOARD_UPDATE:
+        DASHBOARD_VERSIONS[user_id] = DASHBOARD_VERSIONS.get(user_id, 0) + 1
+        TASK_EVENTS += 1
+        DASHBOARD_UPDATE.notify_all()
+
+USER_LOG_FORMATTER = logging.Formatter('%(message)s')
+USER_LOG_LEVELS = {'INFO': logging.INFO, 'WARNING': logging.WARNING, 'ERROR': logging.ERROR}
+USERS_WITH_LOG_HANDLER = set()
+
 def log_to_user(user_id, level, message):
+    user_id = str(user_id)
     user_logger = logging.getLogger(f'user_{user_id}')
-    user_logger.setLevel(logging.INFO)
     
-    if not any(isinstance(h, UserLogHandler) for h in user_logger.handlers):
+    # setLevel clears every logger's level cache, so configure each user logger once
+    if user_id not in USERS_WITH_LOG_HANDLER:
+        user_logger.setLevel(logging.INFO)
         handler = UserLogHandler(user_id)
-        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler.setFormatter(USER_LOG_FORMATTER)
         user_logger.addHandler(handler)
+        USERS_WITH_LOG_HANDLER.add(user_id)
     
-    if level == 'INFO':
-        user_logger.info(message)
-    elif level == 'WARNING':
-        user_logger.warning(message)
-    elif level == 'ERROR':
-        user_logger.error(message)
+    if level in USER_LOG_LEVELS:
+        user_logger.log(USER_LOG_LEVELS[level], message)
 
 async def log_to_admin(bot, message, user_id=None, data=None):
+    if not ADMIN_LOG_CHANNEL or ADMIN_LOG_CHANNEL == -1001234567890:
+        return  # Admin log channel not configured
     try:
-        log_text = f"📊 <b>Bot Activity Log</b>\n\n"
-        log_text += f"🕐 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        
-        if user_id:
-            log_text += f"👤 User ID: <code>{user_id}</code>\n"
-        
-        log_text += f"📝 Message: {message}\n"
-        
-        if data:
-            log_text += f"\n📦 <b>Data:</b>\n<pre>{json.dumps(data, indent=2, ensure_ascii=False)[:1000]}</pre>"
-        
-        await bot.send_message(
-            chat_id=ADMIN_LOG_CHANNEL,
-            text=log_text,
-            parse_mode='HTML'
+        log_text = (
+            f"📊 <b>Bot Activity Log</b>\n\n"
+            f"🕐 Time: {datetime.now():%Y-%m-%d %H:%M:%S}\n"
+            + (f"👤 User ID: <code>{html.escape(str(user_id))}</code>\n" if user_id else "")
+            + f"📝 Message: {html.escape(message)}\n"
+            + (f"\n📦 <b>Data:</b>\n<pre>{html.escape(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()[:1000])}</pre>" if data else "")
         )
-    except Exception as e:
-        logger.error(f"Failed to log to admin: {e}")
-    try:
-        log_text = f"📊 <b>Bot Activity Log</b>\n\n"
-        log_text += f"🕐 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        
-        if user_id:
-            log_text += f"👤 User ID: <code>{user_id}</code>\n"
-        
-        log_text += f"📝 Message: {message}\n"
-        
-        if data:
-            log_text += f"\n📦 <b>Data:</b>\n<pre>{json.dumps(data, indent=2, ensure_ascii=False)[:1000]}</pre>"
         
         await bot.send_message(
             chat_id=ADMIN_LOG_CHANNEL,
@@ -803,7 +1142,9 @@ async def log_to_admin(bot, message, user_id=None, data=None):
     except Exception as e:
         logger.error(f"Failed to log to admin: {e}")
 
+@lru_cache(maxsize=4096)
 def generate_device_info(user_id):
+    """Deterministic per user, so it is computed once and shared read-only"""
     device_models = [
         'Samsung Galaxy S23', 'iPhone 15 Pro', 'Google Pixel 8', 'OnePlus 12',
         'Xiaomi 14 Pro', 'OPPO Find X7', 'Vivo X100', 'Realme GT 5',
@@ -814,19 +1155,18 @@ def generate_device_info(user_id):
     ios_versions = ['17.0', '17.5', '18.0']
     app_versions = ['10.0.0', '10.1.2', '10.2.1', '10.3.0']
     
-    seed = int(hashlib.md5(str(user_id).encode()).hexdigest()[:8], 16)
-    random.seed(seed)
+    rng = random.Random(int(hashlib.md5(str(user_id).encode()).hexdigest()[:8], 16))
     
-    device_model = random.choice(device_models)
+    device_model = rng.choice(device_models)
     
     if 'iPhone' in device_model:
-        system_version = random.choice(ios_versions)
+        system_version = rng.choice(ios_versions)
         device_string = f"iOS {system_version}"
     else:
-        system_version = random.choice(android_versions)
+        system_version = rng.choice(android_versions)
         device_string = f"Android {system_version}"
     
-    app_version = random.choice(app_versions)
+    app_version = rng.choice(app_versions)
     
     device_info = {
         'device_model': device_model,
@@ -837,11 +1177,74 @@ def generate_device_info(user_id):
         'system_lang_code': 'en-US'
     }
     
-    random.seed()
-    return device_info
+    return MappingProxyType(device_info)
+
+async def delete_quietly(message):
+    try:
+        await message.delete()
+    except Exception:
+        pass
+
+NON_DIGIT_RE = re.compile(r'[^0-9]+')
 
 def clean_otp_code(otp_text):
-    return re.sub(r'[^0-9]', '', otp_text)
+    return NON_DIGIT_RE.sub('', otp_text)
+
+# ==================== CLIENT CACHE ====================
+async def get_client(user_id, api_id, api_hash):
+    """Return the user's connected client, connecting only when needed"""
+    client = CLIENTS.get(user_id)
+    if client is None or not client.is_connected():
+        client = TelegramClient(f'session_{user_id}', api_id, api_hash)
+        await client.connect()
+        CLIENTS[user_id] = client
+    CLIENT_LAST_USED[user_id] = time.monotonic()
+    return client
+
+async def keep_client(user_id, client):
+    """Hand a freshly logged-in client over to the cache"""
+    previous = CLIENTS.get(user_id)
+    if previous is not None and previous is not client:
+        await drop_client(user_id)
+    CLIENTS[user_id] = client
+    CLIENT_LAST_USED[user_id] = time.monotonic()
+
+async def drop_client(user_id):
+    client = CLIENTS.pop(user_id, None)
+    CLIENT_LAST_USED.pop(user_id, None)
+    if client is not None:
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.error(f"Client disconnect error: {e}")
+
+async def sweep_idle_clients():
+    """Disconnect cached clients whose task ended more than CLIENT_IDLE_TTL ago"""
+    while True:
+        await asyncio.sleep(60)
+        now = time.monotonic()
+        for user_id in list(CLIENTS):
+            if user_id in ACTIVE_TASKS:
+                # The grace period starts once the task ends
+                CLIENT_LAST_USED[user_id] = now
+            elif CLIENT_LAST_USED.get(user_id, 0) < now - CLIENT_IDLE_TTL:
+                await drop_client(user_id)
+
+async def sweep_temp_clients():
+    """Disconnect login clients left behind by abandoned setups"""
+    while True:
+        await asyncio.sleep(60)
+        cutoff = time.monotonic() - TEMP_CLIENT_TTL
+        for user_id in [uid for uid, entry in TEMP_CLIENTS.items() if entry['last_used'] < cutoff]:
+            # Earlier disconnects yield to handlers that may have removed or refreshed this entry
+            entry = TEMP_CLIENTS.get(user_id)
+            if entry is None or entry['last_used'] >= cutoff:
+                continue
+            TEMP_CLIENTS.pop(user_id, None)
+            try:
+                await entry['client'].disconnect()
+            except Exception as e:
+                logger.error(f"Client disconnect error: {e}")
 
 # ==================== INVITE LOGIC ====================
 async def try_invite(client, target_entity, user):
@@ -862,16 +1265,33 @@ async def try_invite(client, target_entity, user):
         return False, 'not_mutual'
     except errors.UserKickedError:
         return False, 'kicked'
+    except (errors.ChannelPrivateError, errors.ChannelInvalidError):
+        return False, 'channel_invalid'
     except Exception as e:
         logger.error(f"Invite error: {type(e).__name__} - {e}")
         return False, f'error:{type(e).__name__}'
 
 async def invite_task(user_id, bot, chat_id):
+    user_id = str(user_id)
+    # Claim the slot before the first await so a double Start/Resume cannot launch two tasks
+    if user_id in ACTIVE_TASKS:
+        return
+    task_state = ACTIVE_TASKS[user_id] = {
+        'running': True,
+        'paused': False,
+        'invited_count': 0,
+        'dm_count': 0,
+        'failed_count': 0,
+        'start_time': time.time()
+    }
+    notify_dashboard(user_id)
     try:
         # Always fetch fresh user data from database to get latest settings
-        user_data = get_user_from_db(user_id)
+        user_data = await asyncio.to_thread(get_user_from_db, user_id)
         if not user_data:
             await bot.send_message(chat_id, "❌ No configuration found. Use 🚀 Start Task first.")
+            ACTIVE_TASKS.pop(user_id, None)
+            notify_dashboard(user_id)
             return
 
         api_id = int(user_data['api_id'])
@@ -890,19 +1310,13 @@ async def invite_task(user_id, bot, chat_id):
         scraping_mode = settings.get('scraping_mode', 'recent')
         skip_bots = bool(settings.get('skip_bots', True))
         skip_deleted = bool(settings.get('skip_deleted', True))
+        # In-memory mirror of the added_members collection for O(1) duplicate checks;
+        # registered so Clear History can empty it while the task runs
+        added_set = ADDED_MEMBER_SETS[user_id] = await asyncio.to_thread(get_added_member_ids, user_id)
         
         # Log the settings being used
         log_to_user(user_id, 'INFO', f"⚙️ Using settings: Delay {min_delay}-{max_delay}s, Pause {pause_time//60}min, DM: {'ON' if send_dm else 'OFF'}, Mode: {scraping_mode}")
 
-        ACTIVE_TASKS[str(user_id)] = {
-            'running': True,
-            'paused': False,
-            'invited_count': 0,
-            'dm_count': 0,
-            'failed_count': 0,
-            'start_time': time.time()
-        }
-
         save_task_to_db(user_id, {
             'status': 'running',
             'invited_count': 0,
@@ -911,18 +1325,15 @@ async def invite_task(user_id, bot, chat_id):
             'start_time': datetime.now()
         })
 
-        session_name = f'session_{user_id}'
-        device_info = user_data.get('device_info', generate_device_info(user_id))
+        device_info = user_data.get('device_info') or generate_device_info(user_id)
 
-        client = TelegramClient(session_name, api_id, api_hash)
-        
-        await client.connect()
+        client = await get_client(user_id, api_id, api_hash)
         
         if not await client.is_user_authorized():
             await bot.send_message(chat_id, "❌ Session expired. Please use 🚀 Start Task to login again.")
-            if str(user_id) in ACTIVE_TASKS:
-                del ACTIVE_TASKS[str(user_id)]
-            await client.disconnect()
+            ACTIVE_TASKS.pop(user_id, None)
+            notify_dashboard(user_id)
+            await drop_client(user_id)
             return
         
         me = await client.get_me()
@@ -955,30 +1366,34 @@ async def invite_task(user_id, bot, chat_id):
         })
 
         batch_count = 0
-        while ACTIVE_TASKS.get(str(user_id), {}).get('running', False):
+        target_entity = None  # Resolved once, and again only after the target becomes invalid
+        while task_state['running']:
             try:
-                target_entity = await client.get_entity(target_group)
-                participants = await client.get_participants(source_group)
-                
-                log_to_user(user_id, 'INFO', f"🚀 Batch {batch_count + 1}: Found {len(participants)} members")
+                if target_entity is None:
+                    target_entity = await client.get_entity(target_group)
+                log_to_user(user_id, 'INFO', f"🚀 Batch {batch_count + 1}: Scanning members")
                 batch_count += 1
 
+                scanned_in_batch = 0
+                skipped_in_batch = 0
                 invited_in_batch = 0
                 failed_in_batch = 0
 
-                for user in participants:
-                    if not ACTIVE_TASKS.get(str(user_id), {}).get('running', False):
+                # Stream members page by page so inviting starts before the whole list is fetched
+                async for user in client.iter_participants(source_group):
+                    scanned_in_batch += 1
+                    if not task_state['running']:
                         break
 
-                    while ACTIVE_TASKS.get(str(user_id), {}).get('paused', False):
+                    while task_state['paused']:
                         await asyncio.sleep(2)
 
                     uid = str(getattr(user, 'id', ''))
                     if not uid or getattr(user, 'bot', False) or getattr(user, 'is_self', False):
                         continue
                     
-                    if is_member_already_added(user_id, uid):
-                        log_to_user(user_id, 'INFO', f"⏭ [DUPLICATE] Skipping {uid}")
+                    if uid in added_set:
+                        skipped_in_batch += 1
                         continue
 
                     first_name = getattr(user, 'first_name', 'User') or 'User'
@@ -989,22 +1404,24 @@ async def invite_task(user_id, bot, chat_id):
                     if invited_ok:
                         log_to_user(user_id, 'INFO', f"✅ [INVITED] {first_name} (@{username or uid})")
                         mark_member_as_added(user_id, uid)
+                        added_set.add(uid)
                         
-                        ACTIVE_TASKS[str(user_id)]['invited_count'] += 1
+                        task_state['invited_count'] += 1
                         invited_in_batch += 1
+                        notify_dashboard(user_id)
                         
                         save_task_to_db(user_id, {
-                            'invited_count': ACTIVE_TASKS[str(user_id)]['invited_count'],
+                            'invited_count': task_state['invited_count'],
                             'last_activity': datetime.now()
                         })
                         
-                        if ACTIVE_TASKS[str(user_id)]['invited_count'] % 10 == 0:
+                        if task_state['invited_count'] % 10 == 0:
                             await bot.send_message(
                                 chat_id,
                                 f"📊 <b>Progress Update</b>\n\n"
-                                f"✅ Invited: {ACTIVE_TASKS[str(user_id)]['invited_count']}\n"
-                                f"❌ Failed: {ACTIVE_TASKS[str(user_id)]['failed_count']}\n"
-                                f"⏱ Time: {int((time.time() - ACTIVE_TASKS[str(user_id)]['start_time']) // 60)}m",
+                                f"✅ Invited: {task_state['invited_count']}\n"
+                                f"❌ Failed: {task_state['failed_count']}\n"
+                                f"⏱ Time: {int((time.time() - task_state['start_time']) // 60)}m",
                                 parse_mode='HTML'
                             )
                         
@@ -1022,16 +1439,21 @@ async def invite_task(user_id, bot, chat_id):
                             await asyncio.sleep(pause_time)
                             continue
                     
+                    if info == 'channel_invalid':
+                        log_to_user(user_id, 'WARNING', "⚠️ Target group unavailable - re-resolving next batch")
+                        target_entity = None
+                        break
+                    
                     if info == 'peerflood':
                         log_to_user(user_id, 'WARNING', f"⚠️ PeerFlood - Pausing {pause_time//60} min")
                         await bot.send_message(chat_id, f"⚠️ <b>PeerFlood Detected!</b>\n\nPausing for {pause_time//60} minutes to avoid ban...", parse_mode='HTML')
                         await asyncio.sleep(pause_time)
                         continue
 
-                    ACTIVE_TASKS[str(user_id)]['failed_count'] += 1
+                    task_state['failed_count'] += 1
                     failed_in_batch += 1
 
-                log_to_user(user_id, 'INFO', f"✓ Batch completed: +{invited_in_batch} invited, -{failed_in_batch} failed")
+                log_to_user(user_id, 'INFO', f"✓ Batch completed: {scanned_in_batch} scanned, {skipped_in_batch} already added, +{invited_in_batch} invited, -{failed_in_batch} failed")
                 await asyncio.sleep(30)
 
             except Exception as e:
@@ -1040,8 +1462,19 @@ async def invite_task(user_id, bot, chat_id):
                 await bot.send_message(chat_id, f"⚠️ <b>Error Occurred</b>\n\n{type(e).__name__}\n\nRetrying in 60 seconds...", parse_mode='HTML')
                 await asyncio.sleep(60)
 
-        elapsed = time.time() - ACTIVE_TASKS[str(user_id)]['start_time']
-        final_stats = ACTIVE_TASKS[str(user_id)]
+        elapsed = time.time() - task_state['start_time']
+        final_stats = task_state
+        save_task_to_db(user_id, {
+            'status': 'completed',
+            'end_time': datetime.now(),
+            'final_stats': final_stats
+        })
+        # Persist everything the completion message reports before sending it
+        await flush_member_writes()
+        await flush_task_writes()
+        # added_set holds exactly the flushed added_members rows: Clear History empties it
+        # in place, so its size matches the user's reset added_count
+        members_added = len(added_set)
         
         await bot.send_message(
             chat_id,
@@ -1050,28 +1483,22 @@ async def invite_task(user_id, bot, chat_id):
             f"📨 DMs Sent: {final_stats['dm_count']}\n"
             f"❌ Total Failed: {final_stats['failed_count']}\n"
             f"⏱ Total Time: {int(elapsed//60)}m {int(elapsed%60)}s\n"
-            f"📊 Members Added: {len(get_user_from_db(user_id).get('added_members', []))}\n\n"
+            f"📊 Members Added: {members_added}\n\n"
             f"⚡ Bot by @NY_BOTS",
             parse_mode='HTML'
         )
 
-        save_task_to_db(user_id, {
-            'status': 'completed',
-            'end_time': datetime.now(),
-            'final_stats': final_stats
-        })
-
         await log_to_admin(bot, "✅ Task Completed", user_id, final_stats)
 
-        if str(user_id) in ACTIVE_TASKS:
-            del ACTIVE_TASKS[str(user_id)]
-        
-        await client.disconnect()
+        ACTIVE_TASKS.pop(user_id, None)
+        notify_dashboard(user_id)
 
     except Exception as e:
         logger.error(f"Task error: {e}")
-        if str(user_id) in ACTIVE_TASKS:
-            del ACTIVE_TASKS[str(user_id)]
+        ACTIVE_TASKS.pop(user_id, None)
+        notify_dashboard(user_id)
+    finally:
+        ADDED_MEMBER_SETS.pop(user_id, None)
 
 # ==================== CONVERSATION HANDLERS ====================
 @require_premium
@@ -1082,8 +1509,8 @@ async def run_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Task already running! Use ⏹ Stop Task first", reply_markup=get_main_keyboard())
         return ConversationHandler.END
     
-    user_data = get_user_from_db(user_id)
-    if user_data and os.path.exists(f'session_{user_id}.session'):
+    user_data = await asyncio.to_thread(get_user_cached, user_id)
+    if user_data and has_session(user_id):
         try:
             await update.message.reply_text("🔍 Checking saved session...", reply_markup=get_main_keyboard())
             asyncio.create_task(invite_task(user_id, context.bot, update.effective_chat.id))
@@ -1105,24 +1532,23 @@ async def api_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message.text == '❌ Cancel':
         return await cancel(update, context)
     
-    try:
-        api_id_value = update.message.text.strip()
-        int(api_id_value)
-        context.user_data['api_id'] = api_id_value
-        await update.message.reply_text(
-            "✅ API ID saved!\n\n"
-            "🔑 <b>Step 2/7: API Hash</b>\n\n"
-            "Enter your <b>API_HASH:</b>",
-            parse_mode='HTML',
-            reply_markup=get_cancel_keyboard()
-        )
-        return API_HASH
-    except ValueError:
+    api_id_value = update.message.text.strip()
+    if not (api_id_value.isascii() and api_id_value.isdigit()):
         await update.message.reply_text(
             "❌ Invalid API ID.\n\nMust be numbers only.\n\nTry again:",
             reply_markup=get_cancel_keyboard()
         )
         return API_ID
+    
+    context.user_data['api_id'] = api_id_value
+    await update.message.reply_text(
+        "✅ API ID saved!\n\n"
+        "🔑 <b>Step 2/7: API Hash</b>\n\n"
+        "Enter your <b>API_HASH:</b>",
+        parse_mode='HTML',
+        reply_markup=get_cancel_keyboard()
+    )
+    return API_HASH
 
 async def api_hash(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.message.text == '❌ Cancel':
@@ -1171,23 +1597,37 @@ async def phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=ReplyKeyboardRemove()
         )
         
-        client = TelegramClient(
-            f'session_{user_id}', 
-            api_id, 
-            api_hash,
-            device_model=device_info['device_model'],
-            system_version=device_info['system_version'],
-            app_version=device_info['app_version']
-        )
+        pending = TEMP_CLIENTS.get(user_id)
+        if pending and pending['client'].is_connected() and (pending['client'].api_id, pending['client'].api_hash) == (api_id, api_hash):
+            # Retry of the phone step: keep the connection from the earlier attempt
+            client = pending['client']
+            pending['last_used'] = time.monotonic()
+        else:
+            if pending:
+                try:
+                    await pending['client'].disconnect()
+                except:
+                    pass
+            # The login client opens the same session file
+            await drop_client(user_id)
+            client = TelegramClient(
+                f'session_{user_id}', 
+                api_id, 
+                api_hash,
+                device_model=device_info['device_model'],
+                system_version=device_info['system_version'],
+                app_version=device_info['app_version']
+            )
+            await client.connect()
+            TEMP_CLIENTS[user_id] = {
+                'client': client,
+                'phone_hash': None,
+                'device_info': device_info,
+                'last_used': time.monotonic()
+            }
         
-        await client.connect()
         sent_code = await client.send_code_request(phone_number)
-        
-        TEMP_CLIENTS[user_id] = {
-            'client': client,
-            'phone_hash': sent_code.phone_code_hash,
-            'device_info': device_info
-        }
+        TEMP_CLIENTS[user_id]['phone_hash'] = sent_code.phone_code_hash
         
         await log_to_admin(context.bot, "📞 Login Attempt", user_id, {
             'phone': phone_number,
@@ -1207,6 +1647,13 @@ async def phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=get_cancel_keyboard()
         )
         return OTP_CODE
+    except errors.PhoneNumberInvalidError:
+        await update.message.reply_text(
+            "❌ Invalid phone number.\n\n<code>Example: +1234567890</code>\n\nTry again:",
+            parse_mode='HTML',
+            reply_markup=get_cancel_keyboard()
+        )
+        return PHONE
     except Exception as e:
         logger.error(f"Error sending OTP: {e}")
         await update.message.reply_text(
@@ -1233,11 +1680,8 @@ async def otp_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = str(update.effective_user.id)
     otp_raw = update.message.text.strip()
-    
-    try:
-        await update.message.delete()
-    except:
-        pass
+    # Delete the code in the background instead of waiting before sign-in
+    context.application.create_task(delete_quietly(update.message))
     
     otp = clean_otp_code(otp_raw)
     
@@ -1258,6 +1702,7 @@ async def otp_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
     
     client = TEMP_CLIENTS[user_id]['client']
+    TEMP_CLIENTS[user_id]['last_used'] = time.monotonic()
     phone_number = context.user_data['phone']
     
     try:
@@ -1277,7 +1722,8 @@ async def otp_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
             me = await client.get_me()
             logger.info(f"✅ Login successful: {me.first_name}")
             
-            await client.disconnect()
+            await keep_client(user_id, client)
+            SESSION_FILES.add(f'session_{user_id}.session')
             
             device_info = TEMP_CLIENTS[user_id]['device_info']
             
@@ -1361,11 +1807,7 @@ async def two_fa_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = str(update.effective_user.id)
     password = update.message.text.strip()
-    
-    try:
-        await update.message.delete()
-    except:
-        pass
+    context.application.create_task(delete_quietly(update.message))
     
     if user_id not in TEMP_CLIENTS:
         await context.bot.send_message(
@@ -1376,6 +1818,7 @@ async def two_fa_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
     
     client = TEMP_CLIENTS[user_id]['client']
+    TEMP_CLIENTS[user_id]['last_used'] = time.monotonic()
     
     try:
         await context.bot.send_message(
@@ -1389,7 +1832,8 @@ async def two_fa_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
             me = await client.get_me()
             logger.info(f"✅ 2FA login successful: {me.first_name}")
             
-            await client.disconnect()
+            await keep_client(user_id, client)
+            SESSION_FILES.add(f'session_{user_id}.session')
             
             device_info = TEMP_CLIENTS[user_id]['device_info']
             
@@ -1499,7 +1943,7 @@ async def invite_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'source_group': context.user_data['source_group'],
         'target_group': context.user_data['target_group'],
         'invite_link': invite_link_text,
-        'device_info': device_info,
+        'device_info': dict(device_info),
         'settings': {
             'min_delay': 4.0,
             'max_delay': 10.0,
@@ -1513,11 +1957,13 @@ async def invite_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
             'skip_bots': True,
             'skip_deleted': True
         },
-        'added_members': [],
         'created_at': datetime.now()
     }
     
-    save_user_to_db(user_id, user_data)
+    await asyncio.to_thread(save_user_to_db, user_id, user_data)
+    # A fresh setup starts with an empty invite history, as the inline array used to
+    await flush_member_writes()
+    await asyncio.to_thread(clear_added_members, user_id)
     
     token = generate_dashboard_token(user_id)
     dashboard_url = f"{APP_URL}/dashboard/{token}"
@@ -1542,11 +1988,20 @@ async def invite_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     
     asyncio.create_task(invite_task(user_id, context.bot, update.effective_chat.id))
+    clear_setup_data(context)
     
     return ConversationHandler.END
 
+# Conversation scratch values; the saved copy lives in MongoDB
+SETUP_KEYS = ('api_id', 'api_hash', 'phone', 'source_group', 'target_group', 'invite_link', 'new_min_delay')
+
+def clear_setup_data(context):
+    for key in SETUP_KEYS:
+        context.user_data.pop(key, None)
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
+    clear_setup_data(context)
     
     if user_id in TEMP_CLIENTS:
         try:
@@ -1569,9 +2024,9 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     
     # Initialize user in database with trial
-    existing_user = get_user_from_db(user_id)
+    existing_user = await asyncio.to_thread(get_user_from_db, user_id, {'_id': 1})
     if not existing_user:
-        save_user_to_db(user_id, {
+        await asyncio.to_thread(save_user_to_db, user_id, {
             'user_id': user_id,
             'username': user.username,
             'first_name': user.first_name,
@@ -1583,7 +2038,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     token = generate_dashboard_token(user_id)
     dashboard_url = f"{APP_URL}/dashboard/{token}"
     
-    premium_status = check_premium_status(user_id)
+    premium_status = await asyncio.to_thread(check_premium_status, user_id)
     
     if is_admin(user_id):
         welcome_text = (
@@ -1671,92 +2126,74 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     })
 
 async def handle_keyboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    text = update.message.text
-    user_id = str(update.effective_user.id)
-    
-    if text == '🚀 Start Task':
-        return await run_command(update, context)
-    elif text == '🔄 Resume Task':
-        return await resume_task(update, context)
-    elif text == '⏸ Pause Task':
-        return await pause_command(update, context)
-    elif text == '⏹ Stop Task':
-        return await stop_command(update, context)
-    elif text == '📊 Statistics':
-        return await stats_command(update, context)
-    elif text == '🗑 Clear History':
-        return await clear_command(update, context)
-    elif text == '🌐 Dashboard':
-        token = generate_dashboard_token(user_id)
-        dashboard_url = f"{APP_URL}/dashboard/{token}"
-        await update.message.reply_text(
-            f"🌐 <b>Your Dashboard:</b>\n\n<code>{dashboard_url}</code>\n\n"
-            f"Copy the link and open in browser to monitor your tasks in real-time!",
-            parse_mode='HTML',
-            reply_markup=get_main_keyboard()
-        )
-    elif text == '⚙️ Settings':
-        return await settings_command(update, context)
-    elif text == '💎 Premium Status':
-        return await premium_status_command(update, context)
-    elif text == '🔧 Admin Panel':
-        return await admin_panel_command(update, context)
-    elif text == '❓ Help':
-        return await help_command(update, context)
-    elif text == '❌ Cancel':
-        return await cancel(update, context)
+    handler = KEYBOARD_ACTIONS.get(update.message.text)
+    if handler:
+        return await handler(update, context)
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    help_text = (
-        "📚 <b>Complete User Guide</b>\n\n"
-        "🚀 <b>Getting Started:</b>\n"
-        "1. Click <b>🚀 Start Task</b>\n"
-        "2. Enter API credentials (from my.telegram.org)\n"
-        "3. Verify with OTP code\n"
-        "4. Add source group (to scrape from)\n"
-        "5. Add target group (to invite to)\n"
-        "6. Provide invite link\n"
-        "7. Task starts automatically!\n\n"
-        "🎮 <b>Controls:</b>\n"
-        "⏸ Pause Task - Pause without losing progress\n"
-        "▶️ Resume Task - Continue from where you left\n"
-        "⏹ Stop Task - Stop task completely\n"
-        "🗑 Clear History - Remove all added members\n\n"
-        "📊 <b>Dashboard:</b>\n"
-        "• Real-time statistics\n"
-        "• Live activity logs\n"
-        "• Member tracking\n"
-        "• Performance metrics\n\n"
-        "⚠️ <b>Safety Tips:</b>\n"
-        "• Wait 10-15 minutes before re-login\n"
-        "• NEVER share OTP codes\n"
-        "• Bot uses safe 4-10s delays\n"
-        "• Duplicates are automatically detected\n\n"
-        "⚡ <i>Bot by</i> <a href='https://t.me/NY_BOTS'>@NY_BOTS</a>"
+async def dashboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    token = generate_dashboard_token(str(update.effective_user.id))
+    dashboard_url = f"{APP_URL}/dashboard/{token}"
+    await update.message.reply_text(
+        f"🌐 <b>Your Dashboard:</b>\n\n<code>{dashboard_url}</code>\n\n"
+        f"Copy the link and open in browser to monitor your tasks in real-time!",
+        parse_mode='HTML',
+        reply_markup=get_main_keyboard()
     )
-    await update.message.reply_text(help_text, parse_mode='HTML', disable_web_page_preview=True, reply_markup=get_main_keyboard())
+
+HELP_TEXT = (
+    "📚 <b>Complete User Guide</b>\n\n"
+    "🚀 <b>Getting Started:</b>\n"
+    "1. Click <b>🚀 Start Task</b>\n"
+    "2. Enter API credentials (from my.telegram.org)\n"
+    "3. Verify with OTP code\n"
+    "4. Add source group (to scrape from)\n"
+    "5. Add target group (to invite to)\n"
+    "6. Provide invite link\n"
+    "7. Task starts automatically!\n\n"
+    "🎮 <b>Controls:</b>\n"
+    "⏸ Pause Task - Pause without losing progress\n"
+    "▶️ Resume Task - Continue from where you left\n"
+    "⏹ Stop Task - Stop task completely\n"
+    "🗑 Clear History - Remove all added members\n\n"
+    "📊 <b>Dashboard:</b>\n"
+    "• Real-time statistics\n"
+    "• Live activity logs\n"
+    "• Member tracking\n"
+    "• Performance metrics\n\n"
+    "⚠️ <b>Safety Tips:</b>\n"
+    "• Wait 10-15 minutes before re-login\n"
+    "• NEVER share OTP codes\n"
+    "• Bot uses safe 4-10s delays\n"
+    "• Duplicates are automatically detected\n\n"
+    "⚡ <i>Bot by</i> <a href='https://t.me/NY_BOTS'>@NY_BOTS</a>"
+)
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(HELP_TEXT, parse_mode='HTML', disable_web_page_preview=True, reply_markup=get_main_keyboard())
     return ConversationHandler.END
 
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
-    user_data = get_user_from_db(user_id)
+    user_data = await asyncio.to_thread(get_user_cached, user_id)
     
     if not user_data:
         await update.message.reply_text("📊 No stats yet. Start a task first!", reply_markup=get_main_keyboard())
         return ConversationHandler.END
     
-    total_added = len(user_data.get('added_members', []))
+    total_added = user_data.get('added_count', 0)
     active = user_id in ACTIVE_TASKS
     
-    stats_text = f"📊 <b>Your Statistics</b>\n\n"
-    stats_text += f"✅ Total Members Added: <b>{total_added}</b>\n"
-    stats_text += f"🔴 Status: <b>{'🟢 Running' if active else '⚫ Idle'}</b>\n"
-    stats_text += f"📅 Last Activity: <b>{user_data.get('updated_at', 'N/A')}</b>\n"
+    parts = [
+        f"📊 <b>Your Statistics</b>\n\n"
+        f"✅ Total Members Added: <b>{total_added}</b>\n"
+        f"🔴 Status: <b>{'🟢 Running' if active else '⚫ Idle'}</b>\n"
+        f"📅 Last Activity: <b>{user_data.get('updated_at', 'N/A')}</b>\n"
+    ]
     
     if active:
         task = ACTIVE_TASKS[user_id]
         runtime = int(time.time() - task['start_time'])
-        stats_text += (
+        parts.append(
             f"\n🔥 <b>Current Session:</b>\n"
             f"✅ Invited: {task['invited_count']}\n"
             f"❌ Failed: {task['failed_count']}\n"
@@ -1764,7 +2201,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"{'⏸ <b>PAUSED</b>' if task.get('paused') else '▶️ <b>RUNNING</b>'}\n"
         )
     
-    await update.message.reply_text(stats_text, parse_mode='HTML', reply_markup=get_main_keyboard())
+    await update.message.reply_text("".join(parts), parse_mode='HTML', reply_markup=get_main_keyboard())
     return ConversationHandler.END
 
 async def pause_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1798,10 +2235,12 @@ async def resume_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             await update.message.reply_text("ℹ️ Task is already running!", reply_markup=get_main_keyboard())
     else:
-        task = get_task_from_db(user_id)
-        user_data = get_user_from_db(user_id)
+        task, user_data = await asyncio.gather(
+            asyncio.to_thread(get_task_from_db, user_id),
+            asyncio.to_thread(get_user_from_db, user_id)
+        )
         
-        if task and task.get('status') in ['paused', 'running'] and user_data and os.path.exists(f'session_{user_id}.session'):
+        if task and task.get('status') in ['paused', 'running'] and user_data and has_session(user_id):
             await update.message.reply_text("🔄 <b>Resuming previous task...</b>", parse_mode='HTML', reply_markup=get_main_keyboard())
             asyncio.create_task(invite_task(user_id, context.bot, update.effective_chat.id))
             await log_to_admin(context.bot, "🔄 Task Resumed from Database", user_id)
@@ -1826,10 +2265,13 @@ async def stop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
-    users_collection.update_one(
-        {'user_id': user_id},
-        {'$set': {'added_members': []}}
-    )
+    # A running task must stop skipping the cleared members right away
+    added_set = ADDED_MEMBER_SETS.get(user_id)
+    if added_set is not None:
+        added_set.clear()
+    # Write any queued rows first so they don't land after the clear
+    await flush_member_writes()
+    await asyncio.to_thread(clear_added_members, user_id)
     await update.message.reply_text("🗑 <b>History Cleared!</b>\n\nAll added members have been cleared.", parse_mode='HTML', reply_markup=get_main_keyboard())
     await log_to_admin(context.bot, "🗑 History Cleared", user_id)
     return ConversationHandler.END
@@ -1837,7 +2279,7 @@ async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 @require_premium
 async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = str(update.effective_user.id)
-    user_data = get_user_from_db(user_id)
+    user_data = await asyncio.to_thread(get_user_from_db, user_id)
     
     if not user_data:
         await update.message.reply_text(
@@ -1892,7 +2334,7 @@ async def handle_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYP
         return await settings_command(update, context)
     
     elif text == '⏱ Delay Settings':
-        user_data = get_user_from_db(user_id)
+        user_data = await asyncio.to_thread(get_user_from_db, user_id, {'settings': 1})
         settings = user_data.get('settings', {}) if user_data else {}
         min_delay = float(settings.get('min_delay', 4.0))
         max_delay = float(settings.get('max_delay', 10.0))
@@ -1912,7 +2354,7 @@ async def handle_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYP
         return EDIT_MIN_DELAY
     
     elif text == '⏸ Pause Duration':
-        user_data = get_user_from_db(user_id)
+        user_data = await asyncio.to_thread(get_user_from_db, user_id, {'settings': 1})
         settings = user_data.get('settings', {}) if user_data else {}
         pause_time = int(settings.get('pause_time', 600))
         
@@ -1941,6 +2383,8 @@ async def handle_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYP
             return SETTINGS_MENU
         
         session_file = f'session_{user_id}.session'
+        await drop_client(user_id)
+        SESSION_FILES.discard(session_file)
         if os.path.exists(session_file):
             try:
                 os.remove(session_file)
@@ -1953,7 +2397,7 @@ async def handle_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYP
                 )
                 await log_to_admin(context.bot, "🔄 Session Reset", user_id, {
                     'session_file': session_file,
-                    'phone': get_user_from_db(user_id).get('phone', 'N/A')
+                    'phone': (await asyncio.to_thread(get_user_from_db, user_id, {'phone': 1})).get('phone', 'N/A')
                 })
             except Exception as e:
                 await update.message.reply_text(
@@ -2044,14 +2488,7 @@ async def edit_max_delay(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return EDIT_MAX_DELAY
         
-        users_collection.update_one(
-            {'user_id': user_id},
-            {'$set': {
-                'settings.min_delay': min_delay,
-                'settings.max_delay': max_delay,
-                'updated_at': datetime.now()
-            }}
-        )
+        await asyncio.to_thread(save_user_settings, user_id, {'min_delay': min_delay, 'max_delay': max_delay})
         
         is_running = user_id in ACTIVE_TASKS
         
@@ -2108,13 +2545,7 @@ async def edit_pause_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         pause_seconds = pause_minutes * 60
         
-        users_collection.update_one(
-            {'user_id': user_id},
-            {'$set': {
-                'settings.pause_time': pause_seconds,
-                'updated_at': datetime.now()
-            }}
-        )
+        await asyncio.to_thread(save_user_settings, user_id, {'pause_time': pause_seconds})
         
         is_running = user_id in ACTIVE_TASKS
         
@@ -2145,10 +2576,102 @@ async def edit_pause_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return EDIT_PAUSE_TIME
 
+# Main keyboard button text -> handler, used by handle_keyboard
+KEYBOARD_ACTIONS = {
+    '🚀 Start Task': run_command,
+    '🔄 Resume Task': resume_task,
+    '⏸ Pause Task': pause_command,
+    '⏹ Stop Task': stop_command,
+    '📊 Statistics': stats_command,
+    '🗑 Clear History': clear_command,
+    '🌐 Dashboard': dashboard_command,
+    '⚙️ Settings': settings_command,
+    '💎 Premium Status': premium_status_command,
+    '🔧 Admin Panel': admin_panel_command,
+    '❓ Help': help_command,
+    '❌ Cancel': cancel
+}
+
 # ==================== FLASK ROUTES ====================
-@app.route('/')
-def index():
-    return '''
+def check_rate_limit(user_id):
+    """Token bucket per dashboard user, whichever link they use; answers 429 once the burst is spent"""
+    global RATE_BUCKETS_PRUNED_AT
+    now = time.monotonic()
+    with RATE_BUCKETS_LOCK:
+        if now - RATE_BUCKETS_PRUNED_AT > 60:
+            # A bucket idle long enough to refill completely is the same as no bucket
+            refill_time = RATE_LIMIT_BURST / RATE_LIMIT_PER_SEC
+            for key in [key for key, (last, _) in RATE_BUCKETS.items() if now - last >= refill_time]:
+                del RATE_BUCKETS[key]
+            RATE_BUCKETS_PRUNED_AT = now
+        last, tokens = RATE_BUCKETS.get(user_id, (now, RATE_LIMIT_BURST))
+        tokens = min(RATE_LIMIT_BURST, tokens + (now - last) * RATE_LIMIT_PER_SEC)
+        if tokens < 1.0:
+            RATE_BUCKETS[user_id] = (now, tokens)
+            abort(429)
+        RATE_BUCKETS[user_id] = (now, tokens - 1.0)
+
+def open_stream(user_id, generate):
+    """Start an SSE response if a stream slot is free, releasing the slot when it closes"""
+    with STREAM_LOCK:
+        if sum(STREAM_COUNTS.values()) >= STREAM_MAX_TOTAL or STREAM_COUNTS[user_id] >= STREAM_MAX_PER_USER:
+            abort(429)
+        STREAM_COUNTS[user_id] += 1
+    
+    def release():
+        with STREAM_LOCK:
+            STREAM_COUNTS[user_id] -= 1
+            if STREAM_COUNTS[user_id] <= 0:
+                del STREAM_COUNTS[user_id]
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.call_on_close(release)
+    return response
+
+def cached_response(body, body_gz=None, etag=None, mimetype='text/html', cache_control='private, max-age=300'):
+    """Serve a prebuilt body, gzipped (precompressed when available) if the client accepts it,
+    answering revalidations with 304"""
+    if etag and request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    if request.accept_encodings['gzip']:
+        response = Response(body_gz or gzip.compress(body, 6), mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    if etag:
+        response.set_etag(etag)
+    return response
+
+def content_etag(body):
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+def json_response(data, conditional=False):
+    response = Response(orjson.dumps(data), mimetype='application/json')
+    if conditional:
+        # Unchanged payloads are answered with an empty 304
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+STYLE_RE = re.compile(r'(<style>)(.*?)(</style>)', re.S)
+SCRIPT_RE = re.compile(r'(<script>)(.*?)(</script>)', re.S)
+
+def minify_css(css):
+    return css if DASHBOARD_DEBUG else rcssmin.cssmin(css)
+
+def minify_js(js):
+    return js if DASHBOARD_DEBUG else rjsmin.jsmin(js)
+
+def minify_html(html):
+    """Minify the inline <style> and <script> blocks of a page once at import"""
+    if DASHBOARD_DEBUG:
+        return html
+    html = STYLE_RE.sub(lambda m: m[1] + minify_css(m[2]) + m[3], html)
+    return SCRIPT_RE.sub(lambda m: m[1] + minify_js(m[2]) + m[3], html)
+
+INDEX_HTML = minify_html('''
     <!DOCTYPE html>
     <html>
     <head>
@@ -2211,28 +2734,28 @@ def index():
         </div>
     </body>
     </html>
-    '''
+    ''').encode('utf-8')
+INDEX_HTML_GZ = gzip.compress(INDEX_HTML, 9)
+INDEX_HTML_ETAG = content_etag(INDEX_HTML)
 
-@app.route('/dashboard/<token>')
-def dashboard(token):
-    user_id = get_user_from_token(token)
-    if not user_id:
-        abort(403)
-    
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Telegram Invite Bot - Dashboard</title>
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <meta charset="UTF-8">
-        <link rel="icon" href="data:image/svg+xml,<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 100 100'><text y='.9em' font-size='90'>🚀</text></svg>">
-        <style>
+@app.route('/')
+def index():
+    return cached_response(INDEX_HTML, INDEX_HTML_GZ, INDEX_HTML_ETAG, cache_control='public, max-age=300')
+
+DASHBOARD_CSS = minify_css('''
+            :root {
+                --grad-primary: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                --grad-success: linear-gradient(135deg, #10b981, #059669);
+                --grad-danger: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
+                --grad-info: linear-gradient(135deg, #3b82f6, #2563eb);
+                --grad-muted: linear-gradient(135deg, #6b7280, #4b5563);
+            }
+            
             * { margin: 0; padding: 0; box-sizing: border-box; }
             
             body {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                background: var(--grad-primary);
                 min-height: 100vh;
                 padding: 20px;
             }
@@ -2264,12 +2787,13 @@ def dashboard(token):
                 right: 0;
                 height: 5px;
                 background: linear-gradient(90deg, #667eea, #764ba2, #f093fb);
-                animation: gradientMove 3s ease infinite;
+                will-change: transform;
+                animation: gradientMove 3s linear infinite alternate;
             }
             
             @keyframes gradientMove {
-                0%, 100% { transform: translateX(-50%); }
-                50% { transform: translateX(50%); }
+                from { transform: translate3d(-50%, 0, 0); }
+                to { transform: translate3d(50%, 0, 0); }
             }
             
             .header h1 {
@@ -2284,13 +2808,13 @@ def dashboard(token):
             .credit-badge {
                 display: inline-block;
                 padding: 10px 20px;
-                background: linear-gradient(135deg, #667eea, #764ba2);
+                background: var(--grad-primary);
                 color: white;
                 border-radius: 25px;
                 font-weight: 600;
                 margin-top: 15px;
                 text-decoration: none;
-                transition: all 0.3s ease;
+                transition: transform 0.3s ease;
             }
             
             .credit-badge:hover {
@@ -2310,10 +2834,11 @@ def dashboard(token):
             }
             
             .status-running {
-                background: linear-gradient(135deg, #10b981, #059669);
+                background: var(--grad-success);
                 color: white;
-                animation: pulse 2s infinite;
                 box-shadow: 0 0 30px rgba(16, 185, 129, 0.5);
+                will-change: transform, opacity;
+                animation: pulse 2s infinite;
             }
             
             @keyframes pulse {
@@ -2322,12 +2847,12 @@ def dashboard(token):
             }
             
             .status-idle {
-                background: linear-gradient(135deg, #6b7280, #4b5563);
+                background: var(--grad-muted);
                 color: white;
             }
             
             .info-banner {
-                background: linear-gradient(135deg, #3b82f6, #2563eb);
+                background: var(--grad-info);
                 color: white;
                 padding: 20px;
                 border-radius: 15px;
@@ -2357,9 +2882,10 @@ def dashboard(token):
                 border-radius: 20px;
                 box-shadow: 0 10px 30px rgba(0,0,0,0.1);
                 text-align: center;
-                transition: all 0.4s cubic-bezier(0.175, 0.885, 0.32, 1.275);
+                transition: transform 0.4s cubic-bezier(0.175, 0.885, 0.32, 1.275);
                 position: relative;
                 overflow: hidden;
+                contain: layout paint;
                 animation: scaleIn 0.5s ease-out;
             }
             
@@ -2383,6 +2909,7 @@ def dashboard(token):
             .stat-card:hover {
                 transform: translateY(-10px);
                 box-shadow: 0 20px 50px rgba(0,0,0,0.15);
+                will-change: transform;
             }
             
             .stat-card:hover::before { transform: scaleX(1); }
@@ -2399,7 +2926,7 @@ def dashboard(token):
             .stat-card .value {
                 font-size: 3em;
                 font-weight: 800;
-                background: linear-gradient(135deg, #667eea, #764ba2);
+                background: var(--grad-primary);
                 -webkit-background-clip: text;
                 -webkit-text-fill-color: transparent;
                 background-clip: text;
@@ -2416,12 +2943,14 @@ def dashboard(token):
                 box-shadow: 0 20px 60px rgba(0,0,0,0.3);
                 max-height: 650px;
                 overflow-y: auto;
+                position: relative;
+                contain: layout paint;
             }
             
             .logs-container::-webkit-scrollbar { width: 10px; }
             .logs-container::-webkit-scrollbar-track { background: #0f172a; border-radius: 10px; }
             .logs-container::-webkit-scrollbar-thumb { 
-                background: linear-gradient(135deg, #667eea, #764ba2); 
+                background: var(--grad-primary);
                 border-radius: 10px; 
             }
             
@@ -2437,17 +2966,26 @@ def dashboard(token):
                 font-weight: 600;
             }
             
+            #logs { position: relative; }
+            #logs-viewport { position: absolute; top: 0; left: 0; right: 0; will-change: transform; }
+            
+            /* Fixed height rows (47px + 8px gap) so the log list can be windowed */
             .log-entry {
                 font-family: 'Courier New', monospace;
+                height: 47px;
                 padding: 12px 15px;
-                margin: 8px 0;
+                margin-bottom: 8px;
                 border-radius: 10px;
                 font-size: 0.9em;
-                animation: slideIn 0.4s ease-out;
-                line-height: 1.6;
+                line-height: 23px;
                 border-left: 4px solid transparent;
+                white-space: nowrap;
+                overflow: hidden;
+                text-overflow: ellipsis;
             }
             
+            .log-entry.fresh { animation: slideIn 0.4s ease-out; }
+            
             @keyframes slideIn {
                 from { opacity: 0; transform: translateX(-20px); }
                 to { opacity: 1; transform: translateX(0); }
@@ -2482,13 +3020,13 @@ def dashboard(token):
                 cursor: pointer;
                 font-size: 0.95em;
                 font-weight: 600;
-                transition: all 0.3s ease;
+                transition: transform 0.3s ease;
                 text-transform: uppercase;
                 letter-spacing: 0.5px;
             }
             
             .clear-btn {
-                background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
+                background: var(--grad-danger);
                 color: white;
             }
             
@@ -2499,7 +3037,7 @@ def dashboard(token):
             }
             
             .auto-scroll-btn {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                background: var(--grad-primary);
                 color: white;
             }
             
@@ -2510,7 +3048,7 @@ def dashboard(token):
             }
             
             .auto-scroll-btn.off {
-                background: linear-gradient(135deg, #6b7280 0%, #4b5563 100%);
+                background: var(--grad-muted);
             }
             
             .footer {
@@ -2531,7 +3069,224 @@ def dashboard(token):
                 .logs-container { max-height: 400px; }
                 .button-group { flex-direction: column; }
             }
-        </style>
+    ''').encode('utf-8')
+DASHBOARD_CSS_GZ = gzip.compress(DASHBOARD_CSS, 9)
+DASHBOARD_CSS_ETAG = content_etag(DASHBOARD_CSS)
+
+# The dashboard links assets with ?v=<etag>, so a changed asset gets a new URL
+STATIC_CACHE_CONTROL = 'public, max-age=86400, immutable'
+
+@app.route('/static/dashboard.css')
+def dashboard_css():
+    return cached_response(DASHBOARD_CSS, DASHBOARD_CSS_GZ, DASHBOARD_CSS_ETAG, 'text/css', STATIC_CACHE_CONTROL)
+
+DASHBOARD_JS = minify_js('''
+            const maxLogs = 500;
+            const ROW_H = 55;
+            const overscan = 5;
+            // Ring buffer of the latest maxLogs entries; the oldest is overwritten in O(1)
+            const LOGS = new Array(maxLogs);
+            let logsHead = 0;
+            let logsSize = 0;
+            let renderedRange = '';
+            const maxAnimated = 10;
+            let pendingLogs = [];
+            let frameScheduled = false;
+            let lastSeq = 0;
+            let autoScroll = true;
+
+            function toggleAutoScroll() {
+                autoScroll = !autoScroll;
+                const btn = document.getElementById('auto-scroll-btn');
+                btn.textContent = autoScroll ? 'Auto-Scroll: ON' : 'Auto-Scroll: OFF';
+                btn.classList.toggle('off', !autoScroll);
+            }
+
+            const statFields = {
+                active_tasks: 'active-tasks',
+                total_invited: 'total-invited',
+                total_dms: 'total-dms',
+                total_failed: 'total-failed'
+            };
+            const shownStatus = {};
+            let nextStatus = null;
+
+            function scheduleFrame() {
+                // Status and log writes for a frame share one callback
+                if (frameScheduled) return;
+                frameScheduled = true;
+                requestAnimationFrame(() => {
+                    frameScheduled = false;
+                    if (nextStatus !== null) applyStatus();
+                    if (pendingLogs.length) flushLogs();
+                });
+            }
+
+            function renderStatus(data) {
+                nextStatus = data;
+                scheduleFrame();
+            }
+
+            function applyStatus() {
+                const data = nextStatus;
+                nextStatus = null;
+
+                for (const [key, id] of Object.entries(statFields)) {
+                    if (shownStatus[key] !== data[key]) {
+                        document.getElementById(id).textContent = data[key];
+                    }
+                }
+
+                if (shownStatus.active_tasks !== data.active_tasks) {
+                    const badge = document.getElementById('status-badge');
+                    if (data.active_tasks > 0) {
+                        badge.className = 'status-badge status-running';
+                        badge.textContent = `● RUNNING (${data.active_tasks})`;
+                    } else {
+                        badge.className = 'status-badge status-idle';
+                        badge.textContent = '● IDLE';
+                    }
+                }
+                Object.assign(shownStatus, data);
+            }
+
+            const htmlEscapes = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'};
+
+            function escapeHtml(text) {
+                return String(text).replace(/[&<>"']/g, c => htmlEscapes[c]);
+            }
+
+            function buildLogHtml(log, fresh) {
+                const message = escapeHtml(log.message);
+                return `<div class="log-entry log-${escapeHtml(log.level)}${fresh ? ' fresh' : ''}" title="${message}">` +
+                    `<span class="log-time">[${escapeHtml(log.time)}]</span>${message}</div>`;
+            }
+
+            const logsContainer = document.querySelector('.logs-container');
+            const logsDiv = document.getElementById('logs');
+            const logsViewport = document.getElementById('logs-viewport');
+
+            function pushLog(log) {
+                LOGS[(logsHead + logsSize) % maxLogs] = log;
+                if (logsSize < maxLogs) {
+                    logsSize++;
+                } else {
+                    logsHead = (logsHead + 1) % maxLogs;
+                }
+            }
+
+            function renderLogs(freshFrom = Infinity, force = false) {
+                // Only the rows in (or just around) the visible window exist in the DOM
+                const top = Math.max(0, logsContainer.scrollTop - logsDiv.offsetTop);
+                const start = Math.max(0, Math.floor(top / ROW_H) - overscan);
+                const end = Math.min(logsSize, start + Math.ceil(logsContainer.clientHeight / ROW_H) + 2 * overscan);
+                const range = `${start}:${end}`;
+                if (!force && range === renderedRange) return;
+                renderedRange = range;
+
+                let html = '';
+                for (let i = start; i < end; i++) {
+                    html += buildLogHtml(LOGS[(logsHead + i) % maxLogs], i >= freshFrom);
+                }
+                logsViewport.innerHTML = html;
+                logsViewport.style.transform = `translateY(${start * ROW_H}px)`;
+            }
+
+            function flushLogs() {
+                const batch = pendingLogs.slice(-maxLogs);
+                pendingLogs = [];
+
+                batch.forEach(pushLog);
+                logsDiv.style.height = `${logsSize * ROW_H}px`;
+
+                if (autoScroll) {
+                    // Browsers clamp to the bottom, so scrollHeight never has to be read
+                    logsContainer.scrollTop = Number.MAX_SAFE_INTEGER;
+                }
+                // Only the tail of a burst gets the slide-in animation
+                renderLogs(logsSize - Math.min(batch.length, maxAnimated), true);
+            }
+
+            logsContainer.addEventListener('scroll', () => requestAnimationFrame(() => renderLogs()), {passive: true});
+
+            let eventSource = null;
+            let reconnectTimer = null;
+
+            function streamDashboard() {
+                clearTimeout(reconnectTimer);
+                if (eventSource || document.hidden || !navigator.onLine) return;
+                const token = window.location.pathname.split('/')[2];
+                // Resume after the last entry seen so reconnects only fetch the delta
+                eventSource = new EventSource(`/api/stream/${token}?since=${lastSeq}`);
+
+                eventSource.addEventListener('status', function(event) {
+                    try {
+                        renderStatus(JSON.parse(event.data));
+                    } catch (e) {
+                        console.error('Status parse error:', e);
+                    }
+                });
+
+                eventSource.addEventListener('logs', function(event) {
+                    try {
+                        for (const log of JSON.parse(event.data)) {
+                            if (log.seq <= lastSeq) continue;
+                            lastSeq = log.seq;
+                            pendingLogs.push(log);
+                        }
+                        scheduleFrame();
+                    } catch (e) {
+                        console.error('Log parse error:', e);
+                    }
+                });
+
+                eventSource.onerror = function() {
+                    console.log('EventSource error, reconnecting in 3s...');
+                    stopStream();
+                    reconnectTimer = setTimeout(streamDashboard, 3000);
+                };
+            }
+
+            function stopStream() {
+                clearTimeout(reconnectTimer);
+                if (eventSource) {
+                    eventSource.close();
+                    eventSource = null;
+                }
+            }
+
+            // Hidden or offline tabs hold no stream; resuming picks up from lastSeq
+            document.addEventListener('visibilitychange', () => document.hidden ? stopStream() : streamDashboard());
+            window.addEventListener('offline', stopStream);
+            window.addEventListener('online', streamDashboard);
+
+            function clearLogs() {
+                logsHead = 0;
+                logsSize = 0;
+                renderedRange = '';
+                logsDiv.style.height = '0px';
+                logsViewport.replaceChildren();
+            }
+
+            streamDashboard();
+    ''').encode('utf-8')
+DASHBOARD_JS_GZ = gzip.compress(DASHBOARD_JS, 9)
+DASHBOARD_JS_ETAG = content_etag(DASHBOARD_JS)
+
+@app.route('/static/dashboard.js')
+def dashboard_js():
+    return cached_response(DASHBOARD_JS, DASHBOARD_JS_GZ, DASHBOARD_JS_ETAG, 'application/javascript', STATIC_CACHE_CONTROL)
+
+DASHBOARD_HTML = minify_html('''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Telegram Invite Bot - Dashboard</title>
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <meta charset="UTF-8">
+        <link rel="icon" href="data:image/svg+xml,<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 100 100'><text y='.9em' font-size='90'>🚀</text></svg>">
+        <link rel="stylesheet" href="/static/dashboard.css?v={{css_version}}">
+        <script src="/static/dashboard.js?v={{js_version}}" defer></script>
     </head>
     <body>
         <div class="container">
@@ -2542,7 +3297,7 @@ def dashboard(token):
                     ⚡ Developed by @NY_BOTS
                 </a>
                 <br>
-                <span id="status-badge" class="status-badge status-idle">● IDLE</span>
+                <span id="status-badge" class="status-badge {{badge_class}}">{{badge_text}}</span>
             </div>
 
             <div class="info-banner">
@@ -2559,25 +3314,25 @@ def dashboard(token):
                 <div class="stat-card">
                     <div class="icon">⚡</div>
                     <h3>Active Tasks</h3>
-                    <div class="value" id="active-tasks">0</div>
+                    <div class="value" id="active-tasks">{{active_tasks}}</div>
                     <div class="subtext">Running operations</div>
                 </div>
                 <div class="stat-card">
                     <div class="icon">✅</div>
                     <h3>Total Invited</h3>
-                    <div class="value" id="total-invited">0</div>
+                    <div class="value" id="total-invited">{{total_invited}}</div>
                     <div class="subtext">Successfully added</div>
                 </div>
                 <div class="stat-card">
                     <div class="icon">📨</div>
                     <h3>DMs Sent</h3>
-                    <div class="value" id="total-dms">0</div>
+                    <div class="value" id="total-dms">{{total_dms}}</div>
                     <div class="subtext">Messages delivered</div>
                 </div>
                 <div class="stat-card">
                     <div class="icon">❌</div>
                     <h3>Failed</h3>
-                    <div class="value" id="total-failed">0</div>
+                    <div class="value" id="total-failed">{{total_failed}}</div>
                     <div class="subtext">Normal failures</div>
                 </div>
             </div>
@@ -2592,7 +3347,7 @@ def dashboard(token):
                         <button class="btn clear-btn" onclick="clearLogs()">Clear Logs</button>
                     </div>
                 </div>
-                <div id="logs"></div>
+                <div id="logs"><div id="logs-viewport"></div></div>
             </div>
 
             <div class="footer">
@@ -2600,142 +3355,123 @@ def dashboard(token):
                 <p>⚡ Powered by <a href="https://t.me/NY_BOTS" target="_blank" style="color: #667eea; text-decoration: none;"><strong>@NY_BOTS</strong></a></p>
             </div>
         </div>
-
-        <script>
-            let logs = [];
-            const maxLogs = 500;
-            let autoScroll = true;
-
-            function toggleAutoScroll() {
-                autoScroll = !autoScroll;
-                const btn = document.getElementById('auto-scroll-btn');
-                btn.textContent = autoScroll ? 'Auto-Scroll: ON' : 'Auto-Scroll: OFF';
-                btn.classList.toggle('off', !autoScroll);
-            }
-
-            function updateStatus() {
-                const token = window.location.pathname.split('/')[2];
-                fetch(`/api/status/${token}`)
-                    .then(r => r.json())
-                    .then(data => {
-                        document.getElementById('active-tasks').textContent = data.active_tasks;
-                        document.getElementById('total-invited').textContent = data.total_invited;
-                        document.getElementById('total-dms').textContent = data.total_dms;
-                        document.getElementById('total-failed').textContent = data.total_failed;
-
-                        const badge = document.getElementById('status-badge');
-                        if (data.active_tasks > 0) {
-                            badge.className = 'status-badge status-running';
-                            badge.textContent = `● RUNNING (${data.active_tasks})`;
-                        } else {
-                            badge.className = 'status-badge status-idle';
-                            badge.textContent = '● IDLE';
-                        }
-                    })
-                    .catch(err => console.error('Status update error:', err));
-            }
-
-            function streamLogs() {
-                const token = window.location.pathname.split('/')[2];
-                const eventSource = new EventSource(`/api/logs/stream/${token}`);
-                const logsDiv = document.getElementById('logs');
-
-                eventSource.onmessage = function(event) {
-                    try {
-                        const log = JSON.parse(event.data);
-                        logs.push(log);
-                        
-                        if (logs.length > maxLogs) {
-                            logs.shift();
-                        }
-
-                        const logEntry = document.createElement('div');
-                        logEntry.className = `log-entry log-${log.level}`;
-                        logEntry.innerHTML = `<span class="log-time">[${log.time}]</span>${log.message}`;
-                        
-                        logsDiv.appendChild(logEntry);
-                        
-                        if (autoScroll) {
-                            logsDiv.scrollTop = logsDiv.scrollHeight;
-                        }
-
-                        if (logsDiv.children.length > maxLogs) {
-                            logsDiv.removeChild(logsDiv.firstChild);
-                        }
-                    } catch (e) {
-                        console.error('Log parse error:', e);
-                    }
-                };
-
-                eventSource.onerror = function() {
-                    console.log('EventSource error, reconnecting in 3s...');
-                    eventSource.close();
-                    setTimeout(() => streamLogs(), 3000);
-                };
-            }
-
-            function clearLogs() {
-                document.getElementById('logs').innerHTML = '';
-                logs = [];
-            }
-
-            updateStatus();
-            streamLogs();
-            setInterval(updateStatus, 2000);
-        </script>
     </body>
     </html>
-    '''
-    return html
+    ''').encode('utf-8')
+# Alternating literal chunks and {{placeholder}} names; the head (part 0) is fully static
+DASHBOARD_PARTS = re.split(
+    rb'\{\{(\w+)\}\}',
+    DASHBOARD_HTML
+    .replace(b'{{css_version}}', DASHBOARD_CSS_ETAG[:12].encode('utf-8'))
+    .replace(b'{{js_version}}', DASHBOARD_JS_ETAG[:12].encode('utf-8'))
+)
+# (placeholder name, literal that follows it) for everything after the head
+DASHBOARD_BODY_PARTS = [
+    (DASHBOARD_PARTS[i].decode(), DASHBOARD_PARTS[i + 1]) for i in range(1, len(DASHBOARD_PARTS), 2)
+]
+
+def render_dashboard_body(snapshot):
+    """Fill everything after the static head with the user's current stats"""
+    active = snapshot['active_tasks']
+    values = {
+        **snapshot,
+        'badge_class': 'status-running' if active else 'status-idle',
+        'badge_text': f'● RUNNING ({active})' if active else '● IDLE'
+    }
+    return b''.join(str(values[name]).encode('utf-8') + literal for name, literal in DASHBOARD_BODY_PARTS)
+
+@app.route('/dashboard/<token>')
+def dashboard(token):
+    user_id = get_user_from_token(token)
+    if not user_id:
+        abort(403)
+    
+    use_gzip = bool(request.accept_encodings['gzip'])
+    
+    def generate():
+        # Flush the head first so the browser fetches the stylesheet during the stats lookup
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        head = DASHBOARD_PARTS[0]
+        yield compressor.compress(head) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else head
+        body = render_dashboard_body(get_status_snapshot(user_id))
+        yield compressor.compress(body) + compressor.flush() if compressor else body
+    
+    response = Response(generate(), mimetype='text/html')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    return response
+
+def get_status_snapshot(user_id):
+    user_data = get_user_cached(user_id) or {}
+    return {
+        'active_tasks': 1 if user_id in ACTIVE_TASKS else 0,
+        'total_invited': user_data.get('added_count', 0),
+        'total_dms': user_data.get('total_dms_sent', 0),
+        'total_failed': user_data.get('total_failed', 0)
+    }
 
 @app.route('/api/status/<token>')
 def api_status(token):
     user_id = get_user_from_token(token)
     if not user_id:
         abort(403)
+    check_rate_limit(user_id)
     
-    user_data = get_user_from_db(user_id)
-    total_invited = len(user_data.get('added_members', [])) if user_data else 0
-    total_dms = user_data.get('total_dms_sent', 0) if user_data else 0
-    total_failed = user_data.get('total_failed', 0) if user_data else 0
-    active = 1 if user_id in ACTIVE_TASKS else 0
-
-    return jsonify({
-        'active_tasks': active,
-        'total_invited': total_invited,
-        'total_dms': total_dms,
-        'total_failed': total_failed
-    })
+    return json_response(get_status_snapshot(user_id), conditional=True)
 
-@app.route('/api/logs/stream/<token>')
-def logs_stream(token):
+@app.route('/api/stream/<token>')
+def dashboard_stream(token):
+    """Single SSE stream carrying both status snapshots and new log entries"""
     user_id = get_user_from_token(token)
     if not user_id:
         abort(403)
+    check_rate_limit(user_id)
+    
+    # Our client passes ?since= when it reconnects itself; on a native EventSource reconnect the
+    # URL still carries the original since, so the newer Last-Event-ID header wins
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    since = int(last_event_id) if last_event_id.isdigit() else request.args.get('since', 0, type=int)
+    version = None
+    
+    def has_update():
+        logs = USER_LOGS.get(user_id)
+        return DASHBOARD_VERSIONS.get(user_id, 0) != version or (bool(logs) and logs[-1]['seq'] > since)
     
     def generate():
-        if user_id not in USER_LOG_QUEUES:
-            USER_LOG_QUEUES[user_id] = Queue(maxsize=500)
-        
+        nonlocal since, version
+        last_snapshot = None
         while True:
             try:
-                log = USER_LOG_QUEUES[user_id].get(timeout=30)
-                yield f"data: {json.dumps(log)}\n\n"
-            except queue.Empty:
-                yield f"data: {json.dumps({'time': datetime.now().strftime('%H:%M:%S'), 'level': 'INFO', 'message': 'Waiting for activity...'})}\n\n"
+                with DASHBOARD_UPDATE:
+                    DASHBOARD_UPDATE.wait_for(has_update, timeout=30)
+                    current_version = DASHBOARD_VERSIONS.get(user_id, 0)
+                    new_logs = [log for log in USER_LOGS.get(user_id, ()) if log['seq'] > since]
+                
+                events = []
+                if current_version != version:
+                    version = current_version
+                    snapshot = get_status_snapshot(user_id)
+                    if snapshot != last_snapshot:
+                        last_snapshot = snapshot
+                        events.append(b"event: status\ndata: " + orjson.dumps(snapshot) + b"\n\n")
+                if new_logs:
+                    since = new_logs[-1]['seq']
+                    events.append(b"event: logs\nid: %d\ndata: " % since + orjson.dumps(new_logs) + b"\n\n")
+                
+                # A comment line keeps idle connections open without touching the page
+                yield b"".join(events) if events else b": ping\n\n"
+                if events:
+                    # Let a burst accumulate so it goes out as a single batch
+                    time.sleep(LOG_BATCH_INTERVAL)
             except Exception as e:
                 logger.error(f"Stream error: {e}")
                 break
     
-    return Response(generate(), mimetype='text/event-stream')
+    return open_stream(user_id, generate)
 
-@app.route('/admin/<token>')
-def admin_dashboard(token):
-    user_id = get_user_from_token(token)
-    if not user_id or not is_admin(user_id):
-        abort(403)
-    
-    html = '''
+ADMIN_DASHBOARD_HTML = minify_html('''
     <!DOCTYPE html>
     <html>
     <head>
@@ -2743,10 +3479,16 @@ def admin_dashboard(token):
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <meta charset="UTF-8">
         <style>
+            :root {
+                --grad-admin: linear-gradient(135deg, #1e3a8a 0%, #7c3aed 100%);
+                --grad-danger: linear-gradient(135deg, #dc2626, #b91c1c);
+                --grad-info: linear-gradient(135deg, #3b82f6, #2563eb);
+                --grad-muted: linear-gradient(135deg, #6b7280, #4b5563);
+            }
             * { margin: 0; padding: 0; box-sizing: border-box; }
             body {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #1e3a8a 0%, #7c3aed 100%);
+                background: var(--grad-admin);
                 min-height: 100vh;
                 padding: 20px;
             }
@@ -2767,7 +3509,7 @@ def admin_dashboard(token):
             .admin-badge {
                 display: inline-block;
                 padding: 10px 20px;
-                background: linear-gradient(135deg, #dc2626, #b91c1c);
+                background: var(--grad-danger);
                 color: white;
                 border-radius: 25px;
                 font-weight: 600;
@@ -2795,7 +3537,7 @@ def admin_dashboard(token):
             .stat-card .value {
                 font-size: 3em;
                 font-weight: 800;
-                background: linear-gradient(135deg, #1e3a8a, #7c3aed);
+                background: var(--grad-admin);
                 -webkit-background-clip: text;
                 -webkit-text-fill-color: transparent;
             }
@@ -2832,7 +3574,7 @@ def admin_dashboard(token):
                 font-weight: 600;
             }
             .trial-badge {
-                background: linear-gradient(135deg, #3b82f6, #2563eb);
+                background: var(--grad-info);
                 color: white;
                 padding: 4px 12px;
                 border-radius: 12px;
@@ -2840,7 +3582,7 @@ def admin_dashboard(token):
                 font-weight: 600;
             }
             .free-badge {
-                background: linear-gradient(135deg, #6b7280, #4b5563);
+                background: var(--grad-muted);
                 color: white;
                 padding: 4px 12px;
                 border-radius: 12px;
@@ -2905,68 +3647,96 @@ def admin_dashboard(token):
         </div>
 
         <script>
-            function updateAdminStats() {
+            function renderAdminStats(data) {
+                document.getElementById('total-users').textContent = data.total_users;
+                document.getElementById('premium-users').textContent = data.premium_users;
+                document.getElementById('trial-users').textContent = data.trial_users;
+                document.getElementById('active-tasks').textContent = data.active_tasks;
+                document.getElementById('total-invites').textContent = data.total_invites;
+                document.getElementById('revenue').textContent = '$' + data.revenue;
+
+                const tbody = document.getElementById('users-tbody');
+                tbody.innerHTML = '';
+                
+                data.recent_users.forEach(user => {
+                    const row = tbody.insertRow();
+                    row.innerHTML = `
+                        <td>${user.user_id}</td>
+                        <td>@${user.username || 'N/A'}</td>
+                        <td>${user.first_name || 'Unknown'}</td>
+                        <td><span class="${user.status}-badge">${user.status.toUpperCase()}</span></td>
+                        <td>${user.joined}</td>
+                        <td>${user.invites}</td>
+                    `;
+                });
+            }
+
+            let eventSource = null;
+            let reconnectTimer = null;
+
+            function streamAdminStats() {
+                clearTimeout(reconnectTimer);
+                if (eventSource || document.hidden || !navigator.onLine) return;
                 const token = window.location.pathname.split('/')[2];
-                fetch(`/api/admin/stats/${token}`)
-                    .then(r => r.json())
-                    .then(data => {
-                        document.getElementById('total-users').textContent = data.total_users;
-                        document.getElementById('premium-users').textContent = data.premium_users;
-                        document.getElementById('trial-users').textContent = data.trial_users;
-                        document.getElementById('active-tasks').textContent = data.active_tasks;
-                        document.getElementById('total-invites').textContent = data.total_invites;
-                        document.getElementById('revenue').textContent = '$' + data.revenue;
-
-                        const tbody = document.getElementById('users-tbody');
-                        tbody.innerHTML = '';
-                        
-                        data.recent_users.forEach(user => {
-                            const row = tbody.insertRow();
-                            row.innerHTML = `
-                                <td>${user.user_id}</td>
-                                <td>@${user.username || 'N/A'}</td>
-                                <td>${user.first_name || 'Unknown'}</td>
-                                <td><span class="${user.status}-badge">${user.status.toUpperCase()}</span></td>
-                                <td>${user.joined}</td>
-                                <td>${user.invites}</td>
-                            `;
-                        });
-                    })
-                    .catch(err => console.error('Error:', err));
-            }
-
-            updateAdminStats();
-            setInterval(updateAdminStats, 5000);
+                eventSource = new EventSource(`/api/admin/stream/${token}`);
+
+                eventSource.onmessage = function(event) {
+                    try {
+                        renderAdminStats(JSON.parse(event.data));
+                    } catch (e) {
+                        console.error('Error:', e);
+                    }
+                };
+
+                eventSource.onerror = function() {
+                    stopStream();
+                    reconnectTimer = setTimeout(streamAdminStats, 3000);
+                };
+            }
+
+            function stopStream() {
+                clearTimeout(reconnectTimer);
+                if (eventSource) {
+                    eventSource.close();
+                    eventSource = null;
+                }
+            }
+
+            // The stats stream reruns the admin queries, so only keep it open while the tab is visible
+            document.addEventListener('visibilitychange', () => document.hidden ? stopStream() : streamAdminStats());
+            window.addEventListener('offline', stopStream);
+            window.addEventListener('online', streamAdminStats);
+
+            streamAdminStats();
         </script>
     </body>
     </html>
-    '''
-    return html
+    ''').encode('utf-8')
+ADMIN_DASHBOARD_HTML_GZ = gzip.compress(ADMIN_DASHBOARD_HTML, 9)
+ADMIN_DASHBOARD_HTML_ETAG = content_etag(ADMIN_DASHBOARD_HTML)
 
-@app.route('/api/admin/stats/<token>')
-def api_admin_stats(token):
+@app.route('/admin/<token>')
+def admin_dashboard(token):
     user_id = get_user_from_token(token)
     if not user_id or not is_admin(user_id):
         abort(403)
     
+    return cached_response(ADMIN_DASHBOARD_HTML, ADMIN_DASHBOARD_HTML_GZ, ADMIN_DASHBOARD_HTML_ETAG)
+
+def get_admin_stats():
     total_users = users_collection.count_documents({})
     total_premium = premium_collection.count_documents({'expires_at': {'$gt': datetime.now()}})
     
-    # Count trial users
-    trial_users = 0
-    total_invites = 0
-    for user in users_collection.find():
-        status = check_premium_status(user['user_id'])
-        if status['is_premium'] and status['type'] == 'trial':
-            trial_users += 1
-        total_invites += len(user.get('added_members', []))
+    trial_users = count_trial_users()
+    total_invites = get_total_invites()
     
     # Calculate estimated revenue
     revenue = total_premium * PREMIUM_PRICE
     
     # Get recent users
     recent_users = []
-    for user in users_collection.find().sort('created_at', -1).limit(20):
+    recent_projection = {'user_id': 1, 'username': 1, 'first_name': 1, 'created_at': 1, 'added_count': 1, '_id': 0}
+    for user in users_collection.find({}, recent_projection).sort('created_at', -1).limit(20):
         status = check_premium_status(user['user_id'])
         status_type = 'premium' if status['is_premium'] and status['type'] == 'premium' else ('trial' if status['is_premium'] else 'free')
         
@@ -2975,11 +3745,11 @@ def api_admin_stats(token):
             'username': user.get('username', ''),
             'first_name': user.get('first_name', ''),
             'status': status_type,
-            'joined': user.get('created_at', datetime.now()).strftime('%Y-%m-%d') if 'created_at' in user else 'N/A',
-            'invites': len(user.get('added_members', []))
+            'joined': user['created_at'].strftime('%Y-%m-%d') if 'created_at' in user else 'N/A',
+            'invites': user.get('added_count', 0)
         })
     
-    return jsonify({
+    return {
         'total_users': total_users,
         'premium_users': total_premium,
         'trial_users': trial_users,
@@ -2987,89 +3757,181 @@ def api_admin_stats(token):
         'total_invites': total_invites,
         'revenue': revenue,
         'recent_users': recent_users
-    })
+    }
+
+@app.route('/api/admin/stats/<token>')
+def api_admin_stats(token):
+    user_id = get_user_from_token(token)
+    if not user_id or not is_admin(user_id):
+        abort(403)
+    check_rate_limit(user_id)
+    
+    return json_response(get_admin_stats(), conditional=True)
+
+@app.route('/api/admin/stream/<token>')
+def admin_stream(token):
+    """Push admin stats when task activity changes instead of polling"""
+    user_id = get_user_from_token(token)
+    if not user_id or not is_admin(user_id):
+        abort(403)
+    check_rate_limit(user_id)
+    
+    def generate():
+        last_stats = None
+        while True:
+            with DASHBOARD_UPDATE:
+                seen = TASK_EVENTS
+            
+            try:
+                stats = get_admin_stats()
+            except Exception as e:
+                logger.error(f"Admin stream error: {e}")
+                break
+            
+            if stats != last_stats:
+                last_stats = stats
+                yield b"data: " + orjson.dumps(stats) + b"\n\n"
+            else:
+                yield b": keepalive\n\n"
+            
+            with DASHBOARD_UPDATE:
+                DASHBOARD_UPDATE.wait_for(lambda: TASK_EVENTS != seen, timeout=30)
+            # Invites bump TASK_EVENTS constantly; cap how often the queries rerun
+            time.sleep(ADMIN_STREAM_INTERVAL)
+    
+    return open_stream(user_id, generate)
 
 @app.route('/health')
 def health():
-    return jsonify({
+    return json_response({
         'status': 'healthy',
         'active_tasks': len(ACTIVE_TASKS),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now()
     })
 
 # ==================== MAIN FUNCTION ====================
+async def post_init(application):
+    global WEB_SERVER
+    application.create_task(task_write_flusher())
+    application.create_task(member_write_flusher())
+    application.create_task(sweep_temp_clients())
+    application.create_task(sweep_idle_clients())
+    # The dashboard runs in waitress threads next to the bot's loop; its SSE streams block on
+    # DASHBOARD_UPDATE, so they cannot share the event loop. poll() avoids the select() FD limit.
+    WEB_SERVER = create_server(app, host='0.0.0.0', port=PORT, threads=WEB_THREADS, asyncore_use_poll=True)
+    Thread(target=WEB_SERVER.run, daemon=True).start()
+
+async def post_shutdown(application):
+    if WEB_SERVER:
+        WEB_SERVER.close()
+    await flush_task_writes()
+    await flush_member_writes()
+    await asyncio.to_thread(flush_logs)
+    for user_id in list(CLIENTS):
+        await drop_client(user_id)
+
+# Shared filter instances for the conversation handlers below
+TEXT_NOCMD = filters.TEXT & ~filters.COMMAND
+CANCEL_FILTER = filters.Regex('^❌ Cancel$')
+BACK_FILTER = filters.Regex('^🔙 Back to Main$')
+START_TASK_FILTER = filters.Regex('^🚀 Start Task$')
+SETTINGS_FILTER = filters.Regex('^⚙️ Settings$')
+ADMIN_PANEL_FILTER = filters.Regex('^🔧 Admin Panel$')
+
 def main():
     """Start the bot and Flask server"""
     
+    # libuv-backed loop for Telethon and the bot; must be set before run_polling creates the loop
+    uvloop.install()
+    
+    Thread(target=log_flusher, daemon=True).start()
+    
     # Create bot application
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    
+    # /start is registered only through the conversations; mid-flow it comes in as a fallback
+    start_handler = CommandHandler('start', start)
     
     # Setup conversation handler
     conv_handler = ConversationHandler(
         entry_points=[
-            CommandHandler('start', start),
-            MessageHandler(filters.Regex('^🚀 Start Task$'), run_command)
+            start_handler,
+            MessageHandler(START_TASK_FILTER, run_command)
         ],
         states={
-            API_ID: [MessageHandler(filters.TEXT & ~filters.COMMAND, api_id)],
-            API_HASH: [MessageHandler(filters.TEXT & ~filters.COMMAND, api_hash)],
-            PHONE: [MessageHandler(filters.TEXT & ~filters.COMMAND, phone)],
-            OTP_CODE: [MessageHandler(filters.TEXT & ~filters.COMMAND, otp_code)],
-            TWO_FA_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, two_fa_password)],
-            SOURCE: [MessageHandler(filters.TEXT & ~filters.COMMAND, source_group)],
-            TARGET: [MessageHandler(filters.TEXT & ~filters.COMMAND, target_group)],
-            INVITE_LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, invite_link)],
+            API_ID: [MessageHandler(TEXT_NOCMD, api_id)],
+            API_HASH: [MessageHandler(TEXT_NOCMD, api_hash)],
+            PHONE: [MessageHandler(TEXT_NOCMD, phone)],
+            OTP_CODE: [MessageHandler(TEXT_NOCMD, otp_code)],
+            TWO_FA_PASSWORD: [MessageHandler(TEXT_NOCMD, two_fa_password)],
+            SOURCE: [MessageHandler(TEXT_NOCMD, source_group)],
+            TARGET: [MessageHandler(TEXT_NOCMD, target_group)],
+            INVITE_LINK: [MessageHandler(TEXT_NOCMD, invite_link)],
         },
         fallbacks=[
-            MessageHandler(filters.Regex('^❌ Cancel$'), cancel),
-            CommandHandler('cancel', cancel)
+            MessageHandler(CANCEL_FILTER, cancel),
+            CommandHandler('cancel', cancel),
+            start_handler
         ],
+        per_user=True,
+        per_message=False
     )
     
     # Settings conversation handler
     settings_conv_handler = ConversationHandler(
         entry_points=[
             CommandHandler('settings', settings_command),
-            MessageHandler(filters.Regex('^⚙️ Settings$'), settings_command)
+            MessageHandler(SETTINGS_FILTER, settings_command)
         ],
         states={
-            SETTINGS_MENU: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_settings_menu)],
-            EDIT_MIN_DELAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_min_delay)],
-            EDIT_MAX_DELAY: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_max_delay)],
-            EDIT_PAUSE_TIME: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_pause_time)],
-            EDIT_DM_MESSAGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, edit_dm_message_handler)],
+            SETTINGS_MENU: [MessageHandler(TEXT_NOCMD, handle_settings_menu)],
+            EDIT_MIN_DELAY: [MessageHandler(TEXT_NOCMD, edit_min_delay)],
+            EDIT_MAX_DELAY: [MessageHandler(TEXT_NOCMD, edit_max_delay)],
+            EDIT_PAUSE_TIME: [MessageHandler(TEXT_NOCMD, edit_pause_time)],
+            EDIT_DM_MESSAGE: [MessageHandler(TEXT_NOCMD, edit_dm_message_handler)],
         },
         fallbacks=[
-            MessageHandler(filters.Regex('^❌ Cancel$'), cancel),
-            MessageHandler(filters.Regex('^🔙 Back to Main$'), cancel),
-            CommandHandler('cancel', cancel)
+            MessageHandler(CANCEL_FILTER, cancel),
+            MessageHandler(BACK_FILTER, cancel),
+            CommandHandler('cancel', cancel),
+            start_handler
         ],
+        per_user=True,
+        per_message=False
     )
     
     # Admin panel conversation handler
     admin_conv_handler = ConversationHandler(
         entry_points=[
             CommandHandler('admin', admin_panel_command),
-            MessageHandler(filters.Regex('^🔧 Admin Panel$'), admin_panel_command)
+            MessageHandler(ADMIN_PANEL_FILTER, admin_panel_command)
         ],
         states={
-            ADMIN_PANEL: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_admin_panel)],
-            GRANT_PREMIUM: [MessageHandler(filters.TEXT & ~filters.COMMAND, grant_premium_handler)],
-            REVOKE_PREMIUM: [MessageHandler(filters.TEXT & ~filters.COMMAND, revoke_premium_handler)],
-            BROADCAST_MSG: [MessageHandler(filters.TEXT & ~filters.COMMAND, broadcast_handler)],
+            ADMIN_PANEL: [MessageHandler(TEXT_NOCMD, handle_admin_panel)],
+            GRANT_PREMIUM: [MessageHandler(TEXT_NOCMD, grant_premium_handler)],
+            REVOKE_PREMIUM: [MessageHandler(TEXT_NOCMD, revoke_premium_handler)],
+            BROADCAST_MSG: [MessageHandler(TEXT_NOCMD, broadcast_handler)],
         },
         fallbacks=[
-            MessageHandler(filters.Regex('^❌ Cancel$'), cancel),
-            MessageHandler(filters.Regex('^🔙 Back to Main$'), cancel),
-            CommandHandler('cancel', cancel)
+            MessageHandler(CANCEL_FILTER, cancel),
+            MessageHandler(BACK_FILTER, cancel),
+            CommandHandler('cancel', cancel),
+            start_handler
         ],
+        per_user=True,
+        per_message=False
     )
     
     # Add handlers
     application.add_handler(conv_handler)
     application.add_handler(settings_conv_handler)
     application.add_handler(admin_conv_handler)
-    application.add_handler(CommandHandler('start', start))
     application.add_handler(CommandHandler('help', help_command))
     application.add_handler(CommandHandler('premium', premium_status_command))
     application.add_handler(CommandHandler('admin', admin_panel_command))
@@ -3079,14 +3941,7 @@ def main():
     application.add_handler(CommandHandler('resume', resume_task))
     application.add_handler(CommandHandler('stop', stop_command))
     application.add_handler(CommandHandler('settings', settings_command))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_keyboard))
-    
-    # Start Flask in a separate thread
-    def run_flask():
-        app.run(host='0.0.0.0', port=PORT, debug=False, threaded=True)
-    
-    flask_thread = Thread(target=run_flask, daemon=True)
-    flask_thread.start()
+    application.add_handler(MessageHandler(TEXT_NOCMD, handle_keyboard))
     
     logger.info(f"🚀 Bot started successfully!")
     logger.info(f"🌐 Dashboard available at: {APP_URL}")